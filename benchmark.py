@@ -0,0 +1,261 @@
+"""
+Offline throughput benchmarks for the four scripts.
+
+Runs each script's main routine against fake_google's in-process Sheets and
+Gmail services with synthetic leads, and reports rows/sec, API calls and
+peak Python memory.
+
+    python benchmark.py                       # 1k and 10k rows, every benchmark
+    python benchmark.py --rows 100000 --only organizer combiner
+    python benchmark.py --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import contextlib
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import fake_google
+import google_retry
+import leademailblast
+import leads_state_organizer
+import sheet_organizer
+import sheet_writer
+import sheets_combiner
+from fingerprint_cache import FingerprintCache
+from send_journal import SendJournal
+
+SPREADSHEET_ID = "benchmark"
+LEADS_SHEET = "Leads"
+
+# ----------------------------
+# Synthetic leads
+# ----------------------------
+FIRST_NAMES = ["james", "MARY", "Robert", "patricia", "John", "jennifer", "Michael", "linda", "david", "Elizabeth",
+               "William", "barbara", "Richard", "susan", "Joseph", "jessica", "Thomas", "Sarah", "charles", "Karen"]
+LAST_NAMES = ["smith", "Johnson", "WILLIAMS", "brown", "Jones", "garcia", "Miller", "davis", "Rodriguez", "martinez",
+              "Hernandez", "lopez", "Gonzalez", "wilson", "Anderson", "thomas", "Taylor", "moore", "Jackson", "Martin"]
+STATES = ["CA", "California", "tx", "Texas", "NY", "new york", "FL", "Florida", "az", "Arizona", "WA", "nevada", ""]
+CITIES = ["Los Angeles", "austin", "New York", "Miami", "PHOENIX", "Seattle", "Las Vegas", "Fresno"]
+
+# several spellings per field, so header inference has something to do
+HEADER_VARIANTS = {
+    "first": ["First Name", " first_name ", "FNAME", "Given Name"],
+    "last": ["Last Name", "LAST_NAME", "Surname", "lname"],
+    "email": ["Email", "E-mail Address", "Primary Email", "EMAIL ADDRESS"],
+    "phone": ["Phone", "Cell Phone", "Phone Number", "Mobile"],
+    "age": ["Age", "AGE"],
+    "address": ["Address", "Street Address", "address1"],
+    "city": ["City", "CITY"],
+    "state": ["State", "ST", "state"],
+    "zip": ["Zip", "Zip Code", "postal code"],
+}
+JUNK_HEADERS = ["Lead Source", "Notes 1", "Vendor ID", "Campaign", "Score", "Created", "Agent", "Tags"]
+
+
+def random_phone(rnd):
+    digits = "".join(str(rnd.randint(0, 9)) for _ in range(10))
+    style = rnd.randint(0, 4)
+    if style == 0:
+        return digits
+    if style == 1:
+        return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
+    if style == 2:
+        return f"1-{digits[:3]}-{digits[3:6]}-{digits[6:]}"
+    if style == 3:
+        return f"+1 {digits[:3]}.{digits[3:6]}.{digits[6:]}"
+    return ""
+
+
+def make_leads(n: int, seed: int = 0, junk_columns: int = 6):
+    """Header row + n messy lead rows (mixed case, odd phone formats, blanks, dupes)."""
+    rnd = random.Random(seed)
+    fields = list(HEADER_VARIANTS)
+    columns = fields + JUNK_HEADERS[:junk_columns]
+    rnd.shuffle(columns)
+    header = [rnd.choice(HEADER_VARIANTS[c]) if c in HEADER_VARIANTS else c for c in columns]
+
+    rows = [header]
+    for i in range(n):
+        first = rnd.choice(FIRST_NAMES)
+        last = rnd.choice(LAST_NAMES)
+        # ~5% re-use an earlier person so dedup paths get exercised
+        uid = rnd.randint(0, i) if i and rnd.random() < 0.05 else i
+        values = {
+            "first": f" {first} " if rnd.random() < 0.1 else first,
+            "last": last,
+            "email": "" if rnd.random() < 0.03 else f"{first}.{last}{uid}@Example.com".swapcase() if rnd.random() < 0.1 else f"{first}.{last}{uid}@example.com",
+            "phone": random_phone(rnd),
+            "age": str(rnd.randint(25, 85)),
+            "address": f"{rnd.randint(1, 9999)} Main St",
+            "city": rnd.choice(CITIES),
+            "state": rnd.choice(STATES),
+            "zip": f"{rnd.randint(10000, 99999)}",
+        }
+        rows.append([values.get(c, f"x{rnd.randint(0, 999)}") for c in columns])
+    return rows
+
+
+# ----------------------------
+# Benchmarks (each returns the fake services it used)
+# ----------------------------
+@contextlib.contextmanager
+def patched(module, **attrs):
+    saved = {k: getattr(module, k) for k in attrs}
+    for k, v in attrs.items():
+        setattr(module, k, v)
+    try:
+        yield
+    finally:
+        for k, v in saved.items():
+            setattr(module, k, v)
+
+
+def bench_sender(rows, latency, error_rate):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: rows}, latency=latency, error_rate=error_rate)
+    gmail = fake_google.FakeGmailService(latency=latency, error_rate=error_rate)
+    with tempfile.TemporaryDirectory() as tmp, patched(
+        leademailblast, SPREADSHEET_ID=SPREADSHEET_ID, TARGET_SHEET_NAME=LEADS_SHEET, BUSINESS_CARD_PATH=None,
+    ):
+        journal = SendJournal(os.path.join(tmp, "journal.db"))
+        limiter = leademailblast.SendRateLimiter(1e9, 1_000_000, None)
+        leademailblast.run_campaign(lambda: gmail, sheets, journal=journal, limiter=limiter)
+    return [sheets, gmail]
+
+
+def bench_organizer(rows, latency, error_rate):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: rows}, latency=latency, error_rate=error_rate)
+    with tempfile.TemporaryDirectory() as tmp, patched(
+        sheet_organizer, SPREADSHEET_ID=SPREADSHEET_ID, sheets_service=lambda: sheets,
+    ), patched(sheet_writer, new_sheets_service=lambda: sheets):
+        cache = FingerprintCache(os.path.join(tmp, "fingerprints.db"))
+        sheet_organizer.organize_one_sheet_by_headers(LEADS_SHEET, cache=cache)
+        cache.close()
+    return [sheets]
+
+
+def bench_organizer_multi(rows, latency, error_rate, tabs=10):
+    """The same leads split over `tabs` vendor tabs, organized in one organize_sheets run."""
+    size = -(-(len(rows) - 1) // tabs)
+    sheets = fake_google.FakeSheetsService(
+        {f"Vendor {i + 1}": [rows[0]] + rows[1 + i * size:1 + (i + 1) * size] for i in range(tabs)},
+        latency=latency, error_rate=error_rate,
+    )
+    with tempfile.TemporaryDirectory() as tmp, patched(
+        sheet_organizer, SPREADSHEET_ID=SPREADSHEET_ID, sheets_service=lambda: sheets,
+    ), patched(sheet_writer, new_sheets_service=lambda: sheets):
+        cache = FingerprintCache(os.path.join(tmp, "fingerprints.db"))
+        sheet_organizer.organize_sheets(["Vendor *"], cache=cache)
+        cache.close()
+    return [sheets]
+
+
+def bench_combiner(rows, latency, error_rate):
+    sheets = fake_google.FakeSheetsService(
+        {LEADS_SHEET: rows, sheets_combiner.MASTER_SHEET: []}, latency=latency, error_rate=error_rate
+    )
+    with tempfile.TemporaryDirectory() as tmp, patched(
+        sheets_combiner, SPREADSHEET_ID=SPREADSHEET_ID, sheets_service=lambda: sheets,
+        new_sheets_service=lambda: sheets, SOURCE_SHEETS=[(LEADS_SHEET, "A1:Z")],
+    ), patched(sheet_writer, new_sheets_service=lambda: sheets):
+        cache = FingerprintCache(os.path.join(tmp, "fingerprints.db"))
+        sheets_combiner.normalize_all_sources_to_master(cache=cache)
+        cache.close()
+    return [sheets]
+
+
+def bench_state_sort(rows, latency, error_rate, mode="server"):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: rows}, latency=latency, error_rate=error_rate)
+    with patched(
+        leads_state_organizer, SPREADSHEET_ID=SPREADSHEET_ID, sheets_service=lambda: sheets,
+        TARGET_SHEET_NAME=LEADS_SHEET,
+    ), patched(sheet_writer, new_sheets_service=lambda: sheets):
+        leads_state_organizer.sort_sheet_by_state(mode)
+    return [sheets]
+
+
+def bench_state_sort_download(rows, latency, error_rate):
+    return bench_state_sort(rows, latency, error_rate, mode="download")
+
+
+def bench_state_partition(rows, latency, error_rate):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: rows}, latency=latency, error_rate=error_rate)
+    with tempfile.TemporaryDirectory() as tmp, patched(
+        leads_state_organizer, SPREADSHEET_ID=SPREADSHEET_ID, sheets_service=lambda: sheets,
+        TARGET_SHEET_NAME=LEADS_SHEET,
+    ), patched(sheet_writer, new_sheets_service=lambda: sheets):
+        cache = FingerprintCache(os.path.join(tmp, "fingerprints.db"))
+        leads_state_organizer.partition_by_state(cache=cache)
+        cache.close()
+    return [sheets]
+
+
+BENCHMARKS = {
+    "sender": bench_sender,
+    "organizer": bench_organizer,
+    "organizer_multi": bench_organizer_multi,
+    "combiner": bench_combiner,
+    "state_sort": bench_state_sort,
+    "state_sort_download": bench_state_sort_download,
+    "state_partition": bench_state_partition,
+}
+
+
+def run_one(fn, rows, latency, error_rate, measure_memory):
+    google_retry.DEFAULT_EXECUTOR.stats.update(calls=0, retries=0, rate_limited=0)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if measure_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        fakes = fn([list(r) for r in rows], latency, error_rate)
+        elapsed = time.perf_counter() - start
+        peak = None
+        if measure_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    calls = {}
+    for fake in fakes:
+        calls.update(fake.calls)
+    retries = google_retry.DEFAULT_EXECUTOR.stats["retries"]
+    if retries:
+        calls["retries"] = retries
+    return elapsed, calls, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000], help="lead counts to generate")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fake API call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake API calls that return 429")
+    parser.add_argument("--junk-columns", type=int, default=6, help="extra unmapped columns per lead row")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass (peak memory)")
+    parser.add_argument("--quota", action="store_true",
+                        help="enforce the real Sheets per-minute read/write budget (slow on big runs)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.quota:
+        google_retry.DEFAULT_EXECUTOR = google_retry.RequestExecutor(reads_per_minute=0, writes_per_minute=0)
+
+    names = args.only or list(BENCHMARKS)
+    print(f"{'benchmark':<19} {'rows':>9} {'seconds':>9} {'rows/sec':>11} {'api calls':>10} {'peak MB':>8}  calls by method")
+    for n in args.rows:
+        rows = make_leads(n, seed=args.seed, junk_columns=args.junk_columns)
+        for name in names:
+            fn = BENCHMARKS[name]
+            elapsed, calls, _ = run_one(fn, rows, args.latency, args.error_rate, measure_memory=False)
+            peak_mb = "-"
+            if not args.no_memory:
+                # separate pass: tracemalloc slows Python down too much to time under it
+                _, _, peak = run_one(fn, rows, args.latency, args.error_rate, measure_memory=True)
+                peak_mb = f"{peak / 1e6:.1f}"
+            api_calls = sum(v for k, v in calls.items() if k != "retries")
+            by_method = ", ".join(f"{k}={v}" for k, v in sorted(calls.items()))
+            print(f"{name:<19} {n:>9,} {elapsed:>9.2f} {n / elapsed:>11,.0f} {api_calls:>10,} {peak_mb:>8}  {by_method}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+Long-running campaign scheduler built on the leademailblast send path.
+
+Each campaign points at a lead sheet and has a priority, a daily quota and a
+send window in the recipient's local time (derived from the `state` column
+that sheet_organizer.py produces). Unsent leads are copied into a persistent
+SQLite queue, and the queue is drained by the usual rate-limited worker pool
+whenever some recipient is inside their window. Sends go through the same
+SendJournal as leademailblast.py, so neither script resends the other's
+leads and unflushed email_sent timestamps are written back on restart.
+
+    python campaign_scheduler.py     # runs until Ctrl+C
+"""
+import sqlite3
+import time
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import leademailblast as blast
+from lead_normalize import normalize_email
+from send_journal import SendJournal
+from us_states import STATE_TIMEZONES, normalize_state
+
+QUEUE_PATH = "campaign_queue.db"
+
+# ✅ Edit these and press ▶ in VS Code
+# window = (start, end) in the recipient's local time, 24h "HH:MM"
+CAMPAIGNS = [
+    {"name": "open-file", "sheet": "testsheet", "priority": 1, "daily_quota": 50, "window": ("09:00", "18:00")},
+    # {"name": "old-vets", "sheet": "Old Vets", "priority": 2, "daily_quota": 100, "window": ("10:00", "16:00")},
+]
+
+DEFAULT_TIMEZONE = "America/Los_Angeles"   # for leads with no/unknown state
+SYNC_EVERY_SECONDS = 15 * 60                # re-read campaign sheets for new leads
+IDLE_POLL_SECONDS = 60                      # sleep when nothing can be sent right now
+DRAIN_BATCH = 200                           # queue items handed to the send engine per pass
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    name         TEXT PRIMARY KEY,
+    sheet        TEXT NOT NULL,
+    priority     INTEGER NOT NULL,
+    daily_quota  INTEGER,
+    window_start TEXT NOT NULL,
+    window_end   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS queue (
+    id          INTEGER PRIMARY KEY,
+    campaign    TEXT NOT NULL,
+    email       TEXT NOT NULL,
+    row_number  INTEGER NOT NULL,
+    name        TEXT NOT NULL,
+    phone       TEXT NOT NULL,
+    tz          TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',   -- pending | sending | sent | failed | done (sent elsewhere)
+    sent_at     TEXT,
+    sent_day    TEXT,                              -- scheduler-local date, for daily quotas
+    error       TEXT,
+    UNIQUE (campaign, email)
+);
+CREATE INDEX IF NOT EXISTS queue_pending ON queue (campaign, status, row_number);
+"""
+
+
+# ----------------------------
+# Persistent queue
+# ----------------------------
+class CampaignQueue:
+    def __init__(self, path: str = QUEUE_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def upsert_campaign(self, cfg):
+        start, end = cfg["window"]
+        self.conn.execute(
+            "INSERT OR REPLACE INTO campaigns (name, sheet, priority, daily_quota, window_start, window_end) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (cfg["name"], cfg["sheet"], cfg.get("priority", 1), cfg.get("daily_quota"), start, end),
+        )
+        self.conn.commit()
+
+    def enqueue(self, campaign: str, items):
+        """items: (email, row_number, name, phone, tz). Already-queued emails are left alone."""
+        cur = self.conn.executemany(
+            "INSERT OR IGNORE INTO queue (campaign, email, row_number, name, phone, tz) VALUES (?, ?, ?, ?, ?, ?)",
+            [(campaign, *item) for item in items],
+        )
+        self.conn.commit()
+        return cur.rowcount
+
+    def pending(self, campaign: str, limit: int, timezones):
+        """The first `limit` pending items (by row) whose recipient is in one of these time zones."""
+        timezones = list(timezones)
+        if not timezones:
+            return []
+        marks = ", ".join("?" * len(timezones))
+        return self.conn.execute(
+            "SELECT id, email, row_number, name, phone, tz FROM queue "
+            f"WHERE campaign = ? AND status = 'pending' AND tz IN ({marks}) ORDER BY row_number LIMIT ?",
+            (campaign, *timezones, limit),
+        ).fetchall()
+
+    def pending_timezones(self, campaign: str):
+        return [r[0] for r in self.conn.execute(
+            "SELECT DISTINCT tz FROM queue WHERE campaign = ? AND status = 'pending'", (campaign,)
+        )]
+
+    def sent_today(self, campaign=None) -> int:
+        """Sends started today for this campaign (every campaign if None)."""
+        sql = "SELECT COUNT(*) FROM queue WHERE status IN ('sending', 'sent') AND sent_day = ?"
+        args = [datetime.now().date().isoformat()]
+        if campaign is not None:
+            sql += " AND campaign = ?"
+            args.append(campaign)
+        return self.conn.execute(sql, args).fetchone()[0]
+
+    def mark_sending(self, item_id: int):
+        # written before the Gmail call: a crash leaves it 'sending', which is never retried automatically
+        self.conn.execute(
+            "UPDATE queue SET status = 'sending', sent_day = ? WHERE id = ?",
+            (datetime.now().date().isoformat(), item_id),
+        )
+        self.conn.commit()
+
+    def mark_sent(self, item_id: int, ts: str):
+        self.conn.execute("UPDATE queue SET status = 'sent', sent_at = ? WHERE id = ?", (ts, item_id))
+        self.conn.commit()
+
+    def mark_failed(self, item_id: int, error: str, retry: bool):
+        self.conn.execute(
+            "UPDATE queue SET status = ?, sent_day = NULL, error = ? WHERE id = ?",
+            ("pending" if retry else "failed", error, item_id),
+        )
+        self.conn.commit()
+
+    def mark_done(self, item_ids):
+        """Pending items someone else already sent (the journal, or email_sent on the sheet)."""
+        self.conn.executemany(
+            "UPDATE queue SET status = 'done' WHERE id = ? AND status = 'pending'", [(i,) for i in item_ids]
+        )
+        self.conn.commit()
+
+    def retire_emails(self, campaign: str, emails) -> int:
+        """Marks this campaign's pending items for these emails done. Returns how many there were."""
+        cur = self.conn.executemany(
+            "UPDATE queue SET status = 'done' WHERE campaign = ? AND email = ? AND status = 'pending'",
+            [(campaign, email) for email in emails],
+        )
+        self.conn.commit()
+        return cur.rowcount
+
+    def stuck_sending(self):
+        return self.conn.execute(
+            "SELECT campaign, email, row_number FROM queue WHERE status = 'sending'"
+        ).fetchall()
+
+
+# ----------------------------
+# Send windows
+# ----------------------------
+def recipient_timezone(state) -> str:
+    return STATE_TIMEZONES.get(normalize_state(state), DEFAULT_TIMEZONE)
+
+
+def parse_hhmm(s: str):
+    h, m = s.split(":")
+    return int(h), int(m)
+
+
+def in_window(now_utc, tz_name: str, window) -> bool:
+    local = now_utc.astimezone(ZoneInfo(tz_name))
+    start, end = (local.replace(hour=h, minute=m, second=0, microsecond=0) for h, m in map(parse_hhmm, window))
+    return start <= local < end
+
+
+def seconds_until_window(now_utc, tz_name: str, window) -> float:
+    """Seconds until the window next opens for this time zone (0 if it's open)."""
+    if in_window(now_utc, tz_name, window):
+        return 0.0
+    local = now_utc.astimezone(ZoneInfo(tz_name))
+    h, m = parse_hhmm(window[0])
+    opens = local.replace(hour=h, minute=m, second=0, microsecond=0)
+    if opens <= local:
+        opens += timedelta(days=1)
+    return (opens - local).total_seconds()
+
+
+# ----------------------------
+# Sheet -> queue
+# ----------------------------
+class QueuedLead(tuple):
+    """A (row_number_1based, name, email, phone) lead that remembers its queue item + campaign."""
+
+    def __new__(cls, item_id, campaign, row_number_1based, name, email, phone):
+        lead = super().__new__(cls, (row_number_1based, name, email, phone))
+        lead.item_id = item_id
+        lead.campaign = campaign
+        return lead
+
+
+def sync_campaign(sheets_svc, queue, cfg, skip_email=None):
+    """
+    Enqueues every unsent lead of the campaign's sheet and marks queued leads whose
+    email_sent has been filled in since (sent by another script) done.
+    Returns (header_map, number of new items).
+    skip_email(email) -> True leaves out leads already handled (e.g. in the send journal).
+    """
+    sheet = cfg["sheet"]
+    header = blast.read_header_row(sheets_svc, sheet)
+    if not header:
+        return None, 0
+    header_map = blast.build_header_map(header)
+    if "email" not in header_map:
+        print(f"⚠ [{cfg['name']}] No EMAIL column in '{sheet}', skipping.")
+        return None, 0
+    header_map, _ = blast.ensure_email_sent_column_exists([header], header_map, sheets_svc, sheet)
+
+    state_idx = header_map.get("state")
+    email_idx, email_sent_idx = header_map["email"], header_map["email_sent"]
+    fields = ("first_name", "last_name", "full_name", "email", "phone", "email_sent", "state", "duplicate_of")
+    cols = [header_map.get(f) for f in fields]
+    sent_emails = set()
+
+    def collect_sent(numbered_rows):
+        for row_number_1based, row in numbered_rows:
+            if str(blast.get_cell(row, email_sent_idx)).strip():
+                sent_emails.add(normalize_email(blast.get_cell(row, email_idx)))
+            yield row_number_1based, row
+
+    rows = collect_sent(blast.iter_projected_rows(sheets_svc, cols, sheet_name=sheet))
+    items = [
+        (email, row_number_1based, name, phone, recipient_timezone(blast.get_cell(row, state_idx)))
+        for (row_number_1based, name, email, phone), row
+        in blast.iter_unsent_leads(rows, header_map, skip_email, with_rows=True)
+    ]
+    sent_emails.discard("")
+    retired = queue.retire_emails(cfg["name"], sent_emails)
+    if retired:
+        print(f"⏩ [{cfg['name']}] {retired} queued lead(s) were already sent; dropped from the queue.")
+    return header_map, queue.enqueue(cfg["name"], items)
+
+
+# ----------------------------
+# Queue -> Gmail
+# ----------------------------
+def eligible_leads(queue, campaigns, now_utc, skip_email=None):
+    """
+    Pending items inside their recipient's window, highest priority first, within each daily quota.
+    skip_email(email) -> True marks the item done instead (sent since it was queued, e.g. by
+    leademailblast.py), so it's checked right before sending, not just when it was queued.
+    """
+    for cfg in sorted(campaigns, key=lambda c: c.get("priority", 1)):
+        quota = cfg.get("daily_quota")
+        remaining = DRAIN_BATCH if quota is None else min(DRAIN_BATCH, quota - queue.sent_today(cfg["name"]))
+        if remaining <= 0:
+            continue
+        open_tzs = [tz for tz in queue.pending_timezones(cfg["name"]) if in_window(now_utc, tz, cfg["window"])]
+        while True:
+            items = queue.pending(cfg["name"], remaining, open_tzs)
+            handled = [item[0] for item in items if skip_email and skip_email(item[1])]
+            if not handled:
+                break
+            queue.mark_done(handled)
+        for item_id, email, row_number, name, phone, tz in items:
+            yield QueuedLead(item_id, cfg["name"], row_number, name, email, phone)
+
+
+def next_wakeup(queue, campaigns, now_utc) -> float:
+    waits = [
+        seconds_until_window(now_utc, tz, cfg["window"])
+        for cfg in campaigns
+        for tz in queue.pending_timezones(cfg["name"])
+    ]
+    waits = [w for w in waits if w > 0]
+    return min([IDLE_POLL_SECONDS] + waits)
+
+
+def run_scheduler(gmail_factory, sheets_svc, campaigns=CAMPAIGNS, queue=None, limiter=None, once=False,
+                  journal=None):
+    queue = queue or CampaignQueue()
+    journal = journal or SendJournal()
+    limiter = limiter or blast.SendRateLimiter(blast.SEND_RATE_PER_SECOND, blast.SEND_BURST, blast.DAILY_SEND_CAP)
+    limiter.count_earlier_sends(max(queue.sent_today(), journal.sends_on(date.today())))
+    by_name = {cfg["name"]: cfg for cfg in campaigns}
+    for cfg in campaigns:
+        queue.upsert_campaign(cfg)
+
+    for campaign, email, row_number in queue.stuck_sending():
+        print(f"⚠ [{campaign}] Send to {email} (row {row_number}) was interrupted; not resending. Check the Sent folder.")
+
+    buffers = {}        # campaign -> SentWriteBuffer for its sheet
+    last_sync = {}
+
+    def before_send(lead):
+        queue.mark_sending(lead.item_id)
+        journal.record_intent(lead[2], by_name[lead.campaign]["sheet"], lead[0])
+
+    def on_sent(lead, ts):
+        journal.record_sent(lead[2], ts)
+        queue.mark_sent(lead.item_id, ts)
+        buffers[lead.campaign].add(lead[0], ts)
+        print(f"✅ [{lead.campaign}] Sent to {lead[1]} at {lead[2]} | email_sent={ts}")
+
+    def on_failed(lead, exc):
+        if blast.send_was_rejected(exc):
+            journal.clear_intent(lead[2])
+        kind = blast.classify_send_error(exc)
+        if kind == "unconfirmed":
+            # may have been delivered: leave it 'sending' so it's reported, never resent
+            print(f"⚠ [{lead.campaign}] Send to {lead[2]} may have gone out ({exc}); not resending.")
+            return
+        queue.mark_failed(lead.item_id, str(exc), retry=kind == "quota")
+
+    try:
+        while True:
+            for cfg in campaigns:
+                if time.monotonic() - last_sync.get(cfg["name"], float("-inf")) >= SYNC_EVERY_SECONDS:
+                    header_map, added = sync_campaign(sheets_svc, queue, cfg, journal.already_attempted)
+                    last_sync[cfg["name"]] = time.monotonic()
+                    if header_map and cfg["name"] not in buffers:
+                        buffers[cfg["name"]] = blast.SentWriteBuffer(
+                            sheets_svc, header_map["email_sent"], sheet_name=cfg["sheet"],
+                            on_flush=lambda rows, sheet=cfg["sheet"]: journal.mark_synced(sheet, rows),
+                        )
+                        # sends journaled by an earlier run whose timestamps never reached the sheet
+                        synced = blast.sync_journaled_sends(
+                            sheets_svc, journal, buffers[cfg["name"]], header_map["email"], cfg["sheet"]
+                        )
+                        if synced:
+                            print(f"🔁 [{cfg['name']}] Synced {synced} journaled send(s) back to '{cfg['sheet']}'.")
+                    if added:
+                        print(f"📥 [{cfg['name']}] Queued {added} new lead(s) from '{cfg['sheet']}'.")
+
+            now_utc = datetime.now(timezone.utc)
+            leads = [lead for lead in eligible_leads(queue, campaigns, now_utc, journal.already_attempted)
+                     if lead.campaign in buffers]
+            sent = 0
+            if leads:
+                try:
+                    sent = blast.send_leads(
+                        gmail_factory, leads, limiter, on_sent,
+                        before_send=before_send,
+                        on_failed=on_failed,
+                    )
+                except Exception as e:
+                    # already recorded per item by on_failed; keep the scheduler alive
+                    print(f"⚠ Send pass stopped early: {e}")
+
+            for buffer in buffers.values():
+                buffer.flush()
+
+            if once:
+                return sent
+            if not sent:
+                if limiter.daily_cap is not None and limiter.sent_today >= limiter.daily_cap:
+                    wait = IDLE_POLL_SECONDS
+                else:
+                    wait = next_wakeup(queue, [by_name[n] for n in buffers], datetime.now(timezone.utc))
+                time.sleep(wait)
+    finally:
+        for buffer in buffers.values():
+            buffer.flush()
+        queue.close()
+        journal.close()
+
+
+if __name__ == "__main__":
+    if not blast.SPREADSHEET_ID:
+        raise RuntimeError("Missing SPREADSHEET_ID in .env")
+    run_scheduler(blast.gmail_service_factory(), blast.sheets_service())
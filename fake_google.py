@@ -0,0 +1,352 @@
+"""
+In-process stand-ins for the Google API clients used by these scripts.
+
+They mimic the `service.resource().method(...).execute()` call chain, so a
+fake can be passed anywhere a real `build(...)` service is expected.
+Both fakes count calls per method, can add a fixed latency to every
+execute(), and can inject 429 "rate limit" errors.
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+
+from googleapiclient.errors import HttpError
+
+
+class _FakeResponse(dict):
+    """Enough of httplib2.Response for HttpError: .status, .reason and dict headers."""
+
+    def __init__(self, status: int, reason: str):
+        super().__init__({"status": str(status)})
+        self.status = status
+        self.reason = reason
+
+
+def make_http_error(status: int = 429, reason: str = "rateLimitExceeded"):
+    content = json.dumps({
+        "error": {"code": status, "message": reason, "errors": [{"reason": reason}]}
+    }).encode()
+    return HttpError(_FakeResponse(status, reason), content)
+
+
+class _FakeApi:
+    """Shared latency / error injection / call counting."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def _request(self, name, fn):
+        return _FakeRequest(self, name, fn)
+
+    def _before_execute(self, name):
+        with self.lock:
+            self.calls[name] += 1
+            fail = self.error_rate and self._random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise make_http_error(429, "rateLimitExceeded")
+
+
+class _FakeRequest:
+    def __init__(self, api, name, fn):
+        self.api = api
+        self.name = name
+        self._fn = fn
+
+    def execute(self, *args, **kwargs):
+        self.api._before_execute(self.name)
+        return self._fn()
+
+
+# ----------------------------
+# Gmail
+# ----------------------------
+class FakeBatchHttpRequest:
+    """Mimics googleapiclient.http.BatchHttpRequest: add(...) then execute()."""
+
+    def __init__(self, service):
+        self.service = service
+        self.requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        if request_id is None:
+            request_id = str(len(self.requests) + 1)
+        self.requests.append((request_id, request, callback))
+
+    def execute(self, *args, **kwargs):
+        self.service.batch_calls += 1
+        self.service.calls["batch"] += 1
+        for request_id, request, callback in self.requests:
+            try:
+                response, exception = request.execute(), None
+            except Exception as e:
+                response, exception = None, e
+            if callback:
+                callback(request_id, response, exception)
+
+
+class FakeGmailService(_FakeApi):
+    """
+    Fake for `gmail_service.users().messages().send(userId=..., body=...)`.
+    Every sent body is kept in `self.sent` (thread-safe, in completion order).
+    `error_for(body)` may return an exception to raise instead of sending.
+    """
+
+    def __init__(self, latency: float = 0.0, error_for=None, error_rate: float = 0.0, seed: int = 0):
+        super().__init__(latency, error_rate, seed)
+        self.error_for = error_for
+        self.sent = []
+        self.batch_calls = 0
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatchHttpRequest(self)
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def send(self, userId="me", body=None):
+        def run():
+            exc = self.error_for(body) if self.error_for else None
+            if exc is not None:
+                raise exc
+            with self.lock:
+                self.sent.append(body)
+                return {"id": f"fake-{len(self.sent)}", "labelIds": ["SENT"]}
+        return self._request("messages.send", run)
+
+
+# ----------------------------
+# Sheets
+# ----------------------------
+A1_RE = re.compile(r"^([A-Z]*)(\d*)$")
+
+
+def col_to_index(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n - 1
+
+
+def index_to_col(idx0: int) -> str:
+    n = idx0 + 1
+    letters = ""
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def parse_range(rng: str):
+    """
+    "'Sheet'!A2:Z" -> ("Sheet", 1, 0, None, 25), all 0-based and inclusive,
+    None meaning open-ended. A bare "'Sheet'" covers the whole tab.
+    """
+    if "!" in rng:
+        sheet, a1 = rng.rsplit("!", 1)
+    else:
+        sheet, a1 = rng, ""
+    sheet = sheet.strip("'").replace("''", "'")
+    if not a1:
+        return sheet, 0, 0, None, None
+
+    start, _, end = a1.partition(":")
+    c1, r1 = A1_RE.match(start).groups()
+    if end:
+        c2, r2 = A1_RE.match(end).groups()
+    else:
+        c2, r2 = c1, r1
+    return (
+        sheet,
+        int(r1) - 1 if r1 else 0,
+        col_to_index(c1) if c1 else 0,
+        int(r2) - 1 if r2 else None,
+        col_to_index(c2) if c2 else None,
+    )
+
+
+def _trim(values):
+    """Drop trailing empty cells and rows, like the real API does."""
+    out = []
+    for row in values:
+        row = list(row)
+        while row and row[-1] in ("", None):
+            row.pop()
+        out.append(row)
+    while out and not out[-1]:
+        out.pop()
+    return out
+
+
+class FakeSheetsService(_FakeApi):
+    """
+    Fake for `sheets_svc.spreadsheets()...` backed by a dict of
+    sheet name -> list of rows. Supports values().get / update / clear /
+    append / batchGet / batchUpdate / batchClear and spreadsheets().get /
+    batchUpdate (sortRange, addSheet).
+    """
+
+    DEFAULT_ROWS = 1000
+
+    def __init__(self, sheets=None, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        super().__init__(latency, error_rate, seed)
+        self.sheets = {name: [list(r) for r in rows] for name, rows in (sheets or {}).items()}
+        self.sheet_ids = {name: i for i, name in enumerate(self.sheets)}
+
+    # resource chain
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return _FakeValues(self)
+
+    # spreadsheets().get
+    def get(self, spreadsheetId=None, ranges=None, fields=None, includeGridData=False):
+        def run():
+            names = [parse_range(r)[0] for r in ranges] if ranges else list(self.sheets)
+            return {"sheets": [self._sheet_properties(n) for n in names if n in self.sheets]}
+        return self._request("spreadsheets.get", run)
+
+    # spreadsheets().batchUpdate
+    def batchUpdate(self, spreadsheetId=None, body=None):
+        def run():
+            replies = []
+            for req in body.get("requests", []):
+                if "sortRange" in req:
+                    self.sort_range(req["sortRange"]["range"], req["sortRange"].get("sortSpecs", []))
+                    replies.append({})
+                elif "addSheet" in req:
+                    replies.append({"addSheet": self.add_sheet(req["addSheet"].get("properties", {}))})
+                else:
+                    raise make_http_error(400, f"Unsupported request: {sorted(req)}")
+            return {"spreadsheetId": spreadsheetId, "replies": replies}
+        return self._request("spreadsheets.batchUpdate", run)
+
+    def _sheet_properties(self, name):
+        rows = self.sheets[name]
+        return {"properties": {
+            "sheetId": self.sheet_ids[name],
+            "title": name,
+            "gridProperties": {
+                "rowCount": max(len(rows), self.DEFAULT_ROWS),
+                "columnCount": max([len(r) for r in rows] + [26]),
+            },
+        }}
+
+    # --- grid helpers ---
+    def _grid(self, sheet):
+        if sheet not in self.sheets:
+            raise make_http_error(400, f"Unable to parse range: {sheet}")
+        return self.sheets[sheet]
+
+    def read(self, rng, major_dimension="ROWS"):
+        sheet, r1, c1, r2, c2 = parse_range(rng)
+        grid = self._grid(sheet)
+        r2 = len(grid) - 1 if r2 is None else r2
+        values = []
+        for row in grid[r1:r2 + 1]:
+            end = len(row) if c2 is None else c2 + 1
+            values.append(row[c1:end])
+        values = _trim(values)
+        if major_dimension == "COLUMNS":
+            width = max((len(r) for r in values), default=0)
+            values = _trim([[r[c] if c < len(r) else "" for r in values] for c in range(width)])
+        return {"range": rng, "majorDimension": major_dimension, "values": values} if values else {"range": rng}
+
+    def write(self, rng, values):
+        sheet, r1, c1, _, _ = parse_range(rng)
+        grid = self._grid(sheet)
+        for i, row in enumerate(values):
+            r = r1 + i
+            while len(grid) <= r:
+                grid.append([])
+            target = grid[r]
+            if len(target) < c1 + len(row):
+                target.extend([""] * (c1 + len(row) - len(target)))
+            target[c1:c1 + len(row)] = [("" if v is None else v) for v in row]
+        return {"updatedRange": rng, "updatedRows": len(values)}
+
+    def add_sheet(self, properties):
+        name = properties.get("title") or f"Sheet{len(self.sheets) + 1}"
+        if name in self.sheets:
+            raise make_http_error(400, f"A sheet with the name \"{name}\" already exists.")
+        self.sheets[name] = []
+        self.sheet_ids[name] = properties.get("sheetId", max(self.sheet_ids.values(), default=-1) + 1)
+        return self._sheet_properties(name)
+
+    def sort_range(self, grid_range, sort_specs):
+        """Sheets' ordering: blanks last, text compared case-insensitively; stable."""
+        name = next(n for n, i in self.sheet_ids.items() if i == grid_range.get("sheetId", 0))
+        grid = self._grid(name)
+        r1 = grid_range.get("startRowIndex", 0)
+        r2 = grid_range.get("endRowIndex", len(grid))
+        rows = grid[r1:r2]
+        for spec in reversed(sort_specs):
+            col = spec["dimensionIndex"]
+            descending = spec.get("sortOrder") == "DESCENDING"
+            filled = [r for r in rows if col < len(r) and str(r[col]).strip()]
+            blank = [r for r in rows if not (col < len(r) and str(r[col]).strip())]
+            filled.sort(key=lambda r: str(r[col]).lower(), reverse=descending)
+            rows = filled + blank
+        grid[r1:r2] = rows
+
+    def clear(self, rng):
+        sheet, r1, c1, r2, c2 = parse_range(rng)
+        grid = self._grid(sheet)
+        r2 = len(grid) - 1 if r2 is None else r2
+        for row in grid[r1:r2 + 1]:
+            end = len(row) if c2 is None else min(c2 + 1, len(row))
+            for c in range(c1, end):
+                row[c] = ""
+        self.sheets[sheet] = _trim(grid)
+        return {"clearedRange": rng}
+
+
+class _FakeValues:
+    def __init__(self, svc):
+        self.svc = svc
+
+    def get(self, spreadsheetId=None, range=None, majorDimension="ROWS", **kwargs):
+        return self.svc._request("values.get", lambda: self.svc.read(range, majorDimension))
+
+    def batchGet(self, spreadsheetId=None, ranges=(), majorDimension="ROWS", **kwargs):
+        return self.svc._request("values.batchGet", lambda: {
+            "spreadsheetId": spreadsheetId,
+            "valueRanges": [self.svc.read(r, majorDimension) for r in ranges],
+        })
+
+    def update(self, spreadsheetId=None, range=None, valueInputOption=None, body=None, **kwargs):
+        return self.svc._request("values.update", lambda: self.svc.write(range, body.get("values", [])))
+
+    def batchUpdate(self, spreadsheetId=None, body=None, **kwargs):
+        def run():
+            for vr in body.get("data", []):
+                self.svc.write(vr["range"], vr.get("values", []))
+            return {"totalUpdatedRanges": len(body.get("data", []))}
+        return self.svc._request("values.batchUpdate", run)
+
+    def clear(self, spreadsheetId=None, range=None, body=None, **kwargs):
+        return self.svc._request("values.clear", lambda: self.svc.clear(range))
+
+    def batchClear(self, spreadsheetId=None, body=None, **kwargs):
+        return self.svc._request("values.batchClear", lambda: {
+            "clearedRanges": [self.svc.clear(r)["clearedRange"] for r in body.get("ranges", [])],
+        })
+
+    def append(self, spreadsheetId=None, range=None, valueInputOption=None, body=None, **kwargs):
+        def run():
+            sheet, _, c1, _, _ = parse_range(range)
+            start = len(_trim(self.svc._grid(sheet))) + 1
+            return self.svc.write(f"'{sheet}'!{index_to_col(c1)}{start}", body.get("values", []))
+        return self.svc._request("values.append", run)
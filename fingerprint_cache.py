@@ -0,0 +1,126 @@
+"""
+Local SQLite store of content fingerprints, so unchanged tabs and rows
+aren't processed again.
+
+    sheets:  (spreadsheet, sheet) -> hash of the whole tab as last processed
+    rows:    (spreadsheet, sheet, row) -> hash of that row as last processed
+    row_keys: (spreadsheet, sheet, row) -> which lead that row holds (key + source row),
+             for tabs that copy rows from another tab
+
+Callers hash what they read, compare with what's stored, and only store the
+new hashes once their own writes went through.
+"""
+import hashlib
+import sqlite3
+from datetime import datetime
+
+CACHE_PATH = "fingerprints.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sheets (
+    spreadsheet  TEXT NOT NULL,
+    sheet        TEXT NOT NULL,
+    digest       TEXT NOT NULL,
+    updated_at   TEXT NOT NULL,
+    PRIMARY KEY (spreadsheet, sheet)
+);
+CREATE TABLE IF NOT EXISTS rows (
+    spreadsheet  TEXT NOT NULL,
+    sheet        TEXT NOT NULL,
+    row_number   INTEGER NOT NULL,
+    digest       TEXT NOT NULL,
+    PRIMARY KEY (spreadsheet, sheet, row_number)
+);
+CREATE TABLE IF NOT EXISTS row_keys (
+    spreadsheet  TEXT NOT NULL,
+    sheet        TEXT NOT NULL,
+    row_number   INTEGER NOT NULL,
+    key          TEXT NOT NULL,
+    source_row   INTEGER NOT NULL,
+    PRIMARY KEY (spreadsheet, sheet, row_number)
+);
+"""
+
+
+def fingerprint(values) -> str:
+    return hashlib.sha1("\x1f".join(str(v) for v in values).encode("utf-8")).hexdigest()
+
+
+def fingerprint_rows(rows) -> str:
+    """Hash of a block of values; trailing empty cells don't count (the Sheets API drops them)."""
+    h = hashlib.sha1()
+    for row in rows:
+        row = list(row)
+        while row and row[-1] in ("", None):
+            row.pop()
+        h.update("\x1f".join(str(v) for v in row).encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+class FingerprintCache:
+    def __init__(self, path: str = CACHE_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # ----------------------------
+    # Whole tabs
+    # ----------------------------
+    def sheet_digest(self, spreadsheet: str, sheet: str):
+        row = self.conn.execute(
+            "SELECT digest FROM sheets WHERE spreadsheet = ? AND sheet = ?", (spreadsheet, sheet)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_sheet_digest(self, spreadsheet: str, sheet: str, digest: str):
+        self.conn.execute(
+            "INSERT INTO sheets (spreadsheet, sheet, digest, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (spreadsheet, sheet) DO UPDATE SET digest = excluded.digest, updated_at = excluded.updated_at",
+            (spreadsheet, sheet, digest, datetime.now().isoformat(timespec="seconds")),
+        )
+        self.conn.commit()
+
+    # ----------------------------
+    # Rows
+    # ----------------------------
+    def row_digests(self, spreadsheet: str, sheet: str) -> dict:
+        """row_number -> digest for every row stored for this tab."""
+        return dict(self.conn.execute(
+            "SELECT row_number, digest FROM rows WHERE spreadsheet = ? AND sheet = ?", (spreadsheet, sheet)
+        ))
+
+    def replace_row_digests(self, spreadsheet: str, sheet: str, digests: dict):
+        """Stores exactly these row digests for the tab (rows no longer there are dropped)."""
+        with self.conn:
+            self.conn.execute("DELETE FROM rows WHERE spreadsheet = ? AND sheet = ?", (spreadsheet, sheet))
+            self.conn.executemany(
+                "INSERT INTO rows (spreadsheet, sheet, row_number, digest) VALUES (?, ?, ?, ?)",
+                [(spreadsheet, sheet, n, d) for n, d in digests.items()],
+            )
+
+    def row_keys(self, spreadsheet: str, sheet: str) -> dict:
+        """row_number -> (key, source row) for every row stored for this tab."""
+        return {n: (key, source_row) for n, key, source_row in self.conn.execute(
+            "SELECT row_number, key, source_row FROM row_keys WHERE spreadsheet = ? AND sheet = ?",
+            (spreadsheet, sheet),
+        )}
+
+    def replace_row_keys(self, spreadsheet: str, sheet: str, keys: dict):
+        """Stores exactly these row_number -> (key, source row) entries for the tab."""
+        with self.conn:
+            self.conn.execute("DELETE FROM row_keys WHERE spreadsheet = ? AND sheet = ?", (spreadsheet, sheet))
+            self.conn.executemany(
+                "INSERT INTO row_keys (spreadsheet, sheet, row_number, key, source_row) VALUES (?, ?, ?, ?, ?)",
+                [(spreadsheet, sheet, n, key, source_row) for n, (key, source_row) in keys.items()],
+            )
+
+    def forget(self, spreadsheet: str, sheet: str):
+        with self.conn:
+            self.conn.execute("DELETE FROM sheets WHERE spreadsheet = ? AND sheet = ?", (spreadsheet, sheet))
+            self.conn.execute("DELETE FROM rows WHERE spreadsheet = ? AND sheet = ?", (spreadsheet, sheet))
+            self.conn.execute("DELETE FROM row_keys WHERE spreadsheet = ? AND sheet = ?", (spreadsheet, sheet))
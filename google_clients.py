@@ -0,0 +1,81 @@
+"""
+Shared Google API client factory.
+
+- Discovery documents come from a local cache (discovery_cache/), seeded from
+  the copies bundled with google-api-python-client, so building a service
+  never touches the network.
+- Credentials and services are memoized per process.
+- googleapiclient / google-auth are imported lazily, so importing a script
+  stays cheap until it actually talks to Google.
+"""
+import json
+import os
+import threading
+from functools import lru_cache
+
+SERVICE_ACCOUNT_FILE = "sheet_service_account.json"
+SHEETS_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
+DISCOVERY_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "discovery_cache")
+DISCOVERY_URL = "https://{api}.googleapis.com/$discovery/rest?version={version}"
+
+_lock = threading.Lock()
+
+
+def _cache_path(api: str, version: str) -> str:
+    return os.path.join(DISCOVERY_CACHE_DIR, f"{api}.{version}.json")
+
+
+@lru_cache(maxsize=None)
+def discovery_document(api: str, version: str) -> dict:
+    """Parsed discovery document: local cache -> bundled static copy -> network (then cached)."""
+    path = _cache_path(api, version)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    from googleapiclient.discovery_cache import get_static_doc
+    doc = get_static_doc(api, version)
+    if doc is None:
+        import urllib.request
+        with urllib.request.urlopen(DISCOVERY_URL.format(api=api, version=version), timeout=30) as resp:
+            doc = resp.read().decode("utf-8")
+
+    os.makedirs(DISCOVERY_CACHE_DIR, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(doc)
+    os.replace(tmp, path)
+    return json.loads(doc)
+
+
+def build_service(api: str, version: str, credentials):
+    """A new (uncached) service object; use one per thread, they aren't thread-safe."""
+    from googleapiclient.discovery import build_from_document
+    return build_from_document(discovery_document(api, version), credentials=credentials)
+
+
+@lru_cache(maxsize=None)
+def service_account_credentials(path: str = SERVICE_ACCOUNT_FILE, scopes: tuple = tuple(SHEETS_SCOPES)):
+    from google.oauth2 import service_account
+    return service_account.Credentials.from_service_account_file(path, scopes=list(scopes))
+
+
+_sheets_services = {}
+
+
+def sheets_service(path: str = SERVICE_ACCOUNT_FILE):
+    """The process-wide Sheets service for this service account."""
+    with _lock:
+        if path not in _sheets_services:
+            _sheets_services[path] = build_service("sheets", "v4", service_account_credentials(path))
+        return _sheets_services[path]
+
+
+def new_sheets_service(path: str = SERVICE_ACCOUNT_FILE):
+    """A fresh Sheets service (for worker threads); credentials are still shared."""
+    return build_service("sheets", "v4", service_account_credentials(path))
+
+
+def gmail_service(credentials):
+    return build_service("gmail", "v1", credentials)
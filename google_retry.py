@@ -0,0 +1,162 @@
+"""
+Shared executor for Google API requests: retries with exponential backoff and
+jitter, AIMD concurrency control, and a per-minute Sheets read/write budget.
+
+Every script calls `execute(request, kind)` instead of `request.execute()`:
+
+    resp = execute(svc.spreadsheets().values().get(...), "read")
+
+kind is "read" / "write" for Sheets (each has its own per-minute budget) and
+"send" for Gmail. Gmail sends are only retried when Google says it rejected
+them (429 / rate-limit 403); a 5xx or timeout might still have delivered.
+"""
+import random
+import socket
+import threading
+import time
+from collections import deque
+
+from google.auth.exceptions import TransportError
+from googleapiclient.errors import HttpError
+
+# Sheets API default quota is 60 read and 60 write requests per minute per user
+READS_PER_MINUTE = 60
+WRITES_PER_MINUTE = 60
+
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0      # seconds; attempt n waits up to BACKOFF_BASE * 2**n
+BACKOFF_MAX = 64.0
+
+INITIAL_CONCURRENCY = 4
+MAX_CONCURRENCY = 16
+
+RATE_LIMIT_REASONS = ("ratelimitexceeded", "userratelimitexceeded", "quotaexceeded")
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+
+def _status(exc):
+    return getattr(getattr(exc, "resp", None), "status", None)
+
+
+def is_rate_limited(exc) -> bool:
+    if not isinstance(exc, HttpError):
+        return False
+    status = _status(exc)
+    return status == 429 or (status == 403 and any(r in str(exc).lower() for r in RATE_LIMIT_REASONS))
+
+
+def is_retryable(exc, kind: str) -> bool:
+    if is_rate_limited(exc):
+        return True
+    if kind == "send":
+        return False
+    if isinstance(exc, HttpError):
+        return _status(exc) in RETRYABLE_STATUS
+    return isinstance(exc, (TransportError, ConnectionError, socket.timeout, TimeoutError))
+
+
+class MinuteBudget:
+    """Sliding one-minute window: acquire() waits until another request fits."""
+
+    def __init__(self, per_minute: int, clock=time.monotonic, sleep=time.sleep):
+        self.per_minute = per_minute
+        self.clock = clock
+        self.sleep = sleep
+        self.stamps = deque()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = self.clock()
+                while self.stamps and now - self.stamps[0] >= 60:
+                    self.stamps.popleft()
+                if len(self.stamps) < self.per_minute:
+                    self.stamps.append(now)
+                    return
+                wait = 60 - (now - self.stamps[0])
+            self.sleep(wait)
+
+
+class AimdLimiter:
+    """
+    Caps requests in flight. Each success adds 1/limit (about +1 per round trip);
+    each 429 halves the limit.
+    """
+
+    def __init__(self, initial: int = INITIAL_CONCURRENCY, maximum: int = MAX_CONCURRENCY):
+        self.limit = float(initial)
+        self.maximum = maximum
+        self.in_flight = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while self.in_flight >= max(1, int(self.limit)):
+                self.cond.wait()
+            self.in_flight += 1
+
+    def release(self, congested: bool = False):
+        with self.cond:
+            self.in_flight -= 1
+            if congested:
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.cond.notify_all()
+
+
+class RequestExecutor:
+    def __init__(self, reads_per_minute: int = READS_PER_MINUTE, writes_per_minute: int = WRITES_PER_MINUTE,
+                 max_retries: int = MAX_RETRIES, backoff_base: float = BACKOFF_BASE,
+                 backoff_max: float = BACKOFF_MAX, sleep=time.sleep):
+        self.budgets = {
+            "read": MinuteBudget(reads_per_minute, sleep=sleep) if reads_per_minute else None,
+            "write": MinuteBudget(writes_per_minute, sleep=sleep) if writes_per_minute else None,
+        }
+        self.concurrency = {"read": AimdLimiter(), "write": AimdLimiter(), "send": AimdLimiter()}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0}
+        self.lock = threading.Lock()
+
+    def backoff(self, attempt: int) -> float:
+        # "full jitter": anywhere between 0 and the exponential cap
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def execute(self, request, kind: str = "read"):
+        attempt = 0
+        while True:
+            budget = self.budgets.get(kind)
+            if budget:
+                budget.acquire()
+            limiter = self.concurrency[kind]
+            limiter.acquire()
+            congested = False
+            try:
+                with self.lock:
+                    self.stats["calls"] += 1
+                return request.execute()
+            except Exception as e:
+                congested = is_rate_limited(e)
+                if congested:
+                    with self.lock:
+                        self.stats["rate_limited"] += 1
+                if attempt >= self.max_retries or not is_retryable(e, kind):
+                    raise
+            finally:
+                limiter.release(congested)
+
+            with self.lock:
+                self.stats["retries"] += 1
+            self.sleep(self.backoff(attempt))
+            attempt += 1
+
+
+DEFAULT_EXECUTOR = RequestExecutor()
+
+
+def execute(request, kind: str = "read"):
+    return DEFAULT_EXECUTOR.execute(request, kind)
@@ -0,0 +1,138 @@
+"""
+Shared header-row inference: which column holds first_name, email, phone, ...
+
+All scripts use the same alias table, compiled once into
+  - an exact-match dict (normalized alias -> fields), and
+  - an Aho-Corasick automaton for the "header contains alias" fallback,
+so a header row is scanned once instead of fields x headers x aliases.
+Results are cached per header row.
+
+Rules (same as the old per-script build_header_map):
+  1. exact match: the first column whose normalized header equals an alias
+  2. otherwise contains match: the first column whose header contains an alias
+Aliases of 2 characters or fewer ("st") only match exactly, so "first" or
+"street" don't get read as a state column.
+"""
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List
+
+ColumnMap = Dict[str, int]   # canonical field -> 0-based column index
+
+# Header aliases (add your own if needed)
+FIELD_ALIASES: Dict[str, List[str]] = {
+    "first_name": ["first", "first name", "firstname", "fname", "given name"],
+    "last_name": ["last", "last name", "lastname", "lname", "surname", "family name"],
+    "full_name": ["name", "full name", "fullname", "client name", "prospect name"],
+    "email": ["email", "e-mail", "email address", "mail", "gmail"],
+    "phone": ["phone", "phone number", "phonenumber", "number", "mobile", "cell", "cell phone",
+              "telephone", "tel", "contact number"],
+    "age": ["age"],
+    "address": ["address", "street", "street address", "address1", "address 1"],
+    "city": ["city"],
+    "state": ["state", "st", "province", "region"],
+    "zip": ["zip", "zipcode", "zip code", "postal", "postal code"],
+    "email_sent": ["email_sent", "email sent", "emailed", "emailed_date", "email date", "sent at", "sent_on",
+                   "sent date"],
+    "duplicate_of": ["duplicate_of", "duplicate of"],
+}
+
+EXACT_ONLY_MAX_LEN = 2
+
+
+def normalize_header(h) -> str:
+    h = str(h or "").strip().lower()
+    h = re.sub(r"[\s\-_]+", " ", h)
+    h = re.sub(r"[^a-z0-9 ]+", "", h)
+    return h
+
+
+class _AhoCorasick:
+    """Finds every pattern contained in a string in one pass over it."""
+
+    def __init__(self, patterns: Dict[str, set]):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [set()]
+        for pattern, values in patterns.items():
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(set())
+                node = nxt
+            self.out[node] |= values
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] |= self.out[self.fail[nxt]]
+
+    def search(self, text: str) -> set:
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            if self.out[node]:
+                found |= self.out[node]
+        return found
+
+
+class HeaderSchema:
+    def __init__(self, aliases: Dict[str, List[str]]):
+        self.aliases = aliases
+        self.fields = list(aliases)
+        self.exact: Dict[str, set] = {}
+        contains: Dict[str, set] = {}
+        for field, names in aliases.items():
+            for name in names:
+                alias = normalize_header(name)
+                if not alias:
+                    continue
+                self.exact.setdefault(alias, set()).add(field)
+                if len(alias) > EXACT_ONLY_MAX_LEN:
+                    contains.setdefault(alias, set()).add(field)
+        self.automaton = _AhoCorasick(contains)
+        self._infer = lru_cache(maxsize=1024)(self._infer_uncached)
+
+    def _infer_uncached(self, header_row: tuple) -> tuple:
+        headers = [normalize_header(h) for h in header_row]
+        exact: ColumnMap = {}
+        contains: ColumnMap = {}
+        for i, h in enumerate(headers):
+            if not h:
+                continue
+            for field in self.exact.get(h, ()):
+                exact.setdefault(field, i)
+            for field in self.automaton.search(h):
+                contains.setdefault(field, i)
+        # keep the alias table's field order, exact matches first
+        return tuple(
+            (field, exact[field] if field in exact else contains[field])
+            for field in self.fields
+            if field in exact or field in contains
+        )
+
+    def infer(self, header_row) -> ColumnMap:
+        """canonical field -> column index for every field found in the header row."""
+        return dict(self._infer(tuple(str(h or "") for h in header_row)))
+
+
+DEFAULT_SCHEMA = HeaderSchema(FIELD_ALIASES)
+
+
+def infer_columns(header_row) -> ColumnMap:
+    return DEFAULT_SCHEMA.infer(header_row)
@@ -0,0 +1,357 @@
+"""
+Duplicate detection for Master leads.
+
+Exact linkage: records that share an email or phone, directly or through a
+chain of other records, are one person (union-find components); name+zip
+also links them, unless both carry a different email or phone.
+sheets_combiner merges each component into one row.
+
+Fuzzy matching: finds the near-misses (typos, nicknames, reformatted
+emails) and links them instead of merging: each duplicate points at the
+lead it matches, with a match score, and a human (or the sender) can
+decide what to do with it. A similar name is never enough on its own: a
+pair also needs the same phone, a similar email local part or a similar
+address, and different first names (other than nicknames / initials),
+different phones or unrelated emails rule a match out.
+Rows are only compared when they share a
+blocking key:
+  - Soundex of the surname + first 3 digits of the ZIP
+  - MinHash bands over 3-character shingles of the email's local part
+and, inside a block, only with their BLOCK_WINDOW nearest neighbours in
+name order, so the work grows linearly with the number of leads.
+"""
+import zlib
+from collections import defaultdict
+from functools import lru_cache
+
+MATCH_THRESHOLD = 0.90     # score at or above this -> duplicate_of link
+NAME_GATE = 0.80           # pairs whose names are less alike than this never match
+EVIDENCE_SIM = 0.85        # email local parts / addresses at least this alike count as evidence
+
+SHINGLE_SIZE = 3
+MINHASH_BANDS = 4
+MINHASH_ROWS = 2           # hashes per band; pairs sharing any whole band are compared
+BLOCK_WINDOW = 8
+
+_PRIME = (1 << 61) - 1
+_MINHASH_SEEDS = [(2 * i + 1) * 0x9E3779B97F4A7C15 % _PRIME for i in range(MINHASH_BANDS * MINHASH_ROWS)]
+
+# common nicknames -> the given name they're short for
+NICKNAMES = {
+    "bob": "robert", "bobby": "robert", "rob": "robert", "robbie": "robert",
+    "bill": "william", "billy": "william", "will": "william", "willie": "william",
+    "jim": "james", "jimmy": "james", "jamie": "james",
+    "mike": "michael", "mikey": "michael", "mick": "michael",
+    "dave": "david", "davey": "david",
+    "dan": "daniel", "danny": "daniel",
+    "joe": "joseph", "joey": "joseph",
+    "tom": "thomas", "tommy": "thomas",
+    "chris": "christopher",
+    "dick": "richard", "rick": "richard", "rich": "richard", "ricky": "richard",
+    "charlie": "charles", "chuck": "charles",
+    "tony": "anthony",
+    "steve": "steven", "stephen": "steven",
+    "matt": "matthew",
+    "andy": "andrew", "drew": "andrew",
+    "ed": "edward", "eddie": "edward", "ted": "edward",
+    "larry": "lawrence",
+    "jerry": "gerald",
+    "greg": "gregory",
+    "ron": "ronald", "ronnie": "ronald",
+    "don": "donald", "donnie": "donald",
+    "ken": "kenneth", "kenny": "kenneth",
+    "liz": "elizabeth", "beth": "elizabeth", "betty": "elizabeth", "lizzie": "elizabeth",
+    "kate": "katherine", "katie": "katherine", "kathy": "katherine", "catherine": "katherine",
+    "jen": "jennifer", "jenny": "jennifer",
+    "pat": "patricia", "patty": "patricia", "trish": "patricia",
+    "sue": "susan", "susie": "susan",
+    "peggy": "margaret", "maggie": "margaret", "meg": "margaret",
+    "barb": "barbara",
+    "debbie": "deborah", "deb": "deborah",
+    "cindy": "cynthia",
+    "vicky": "victoria", "vicki": "victoria",
+}
+
+# given names common enough to recognise a first-name column by
+COMMON_FIRST_NAMES = set(NICKNAMES) | set(NICKNAMES.values()) | {
+    "john", "mary", "linda", "jessica", "sarah", "karen", "nancy", "lisa", "sandra", "ashley", "emily", "donna",
+    "michelle", "carol", "amanda", "melissa", "dorothy", "helen", "laura", "anna", "ruth", "sharon", "paul",
+    "mark", "george", "kevin", "brian", "jason", "ryan", "gary", "eric", "jacob", "nicholas", "jonathan",
+    "frank", "scott", "justin", "brandon", "benjamin", "samuel", "raymond", "patrick", "jack", "dennis",
+    "jose", "maria", "juan", "carlos", "luis", "ana", "rosa", "carmen", "angela", "brenda", "amy", "kimberly",
+}
+
+
+# ----------------------------
+# String helpers
+# ----------------------------
+_SOUNDEX_CODES = {}
+for _letters, _digit in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"), ("l", "4"), ("mn", "5"), ("r", "6")):
+    for _ch in _letters:
+        _SOUNDEX_CODES[_ch] = _digit
+
+
+def soundex(name: str) -> str:
+    """American Soundex: "Robert" / "Rupert" -> "R163"."""
+    letters = [c for c in name.lower() if "a" <= c <= "z"]
+    if not letters:
+        return ""
+    out = [letters[0].upper()]
+    prev = _SOUNDEX_CODES.get(letters[0], "")
+    for c in letters[1:]:
+        code = _SOUNDEX_CODES.get(c, "")
+        if code and code != prev:
+            out.append(code)
+            if len(out) == 4:
+                break
+        if c not in "hw":
+            prev = code
+    return "".join(out).ljust(4, "0")
+
+
+@lru_cache(maxsize=1 << 16)
+def jaro_winkler(a: str, b: str) -> float:
+    if a == b:
+        return 1.0 if a else 0.0
+    if not a or not b:
+        return 0.0
+    window = max(max(len(a), len(b)) // 2 - 1, 0)
+    a_hit = [False] * len(a)
+    b_hit = [False] * len(b)
+    matches = 0
+    for i, ch in enumerate(a):
+        for j in range(max(0, i - window), min(len(b), i + window + 1)):
+            if not b_hit[j] and b[j] == ch:
+                a_hit[i] = b_hit[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+    a_matched = [ch for ch, hit in zip(a, a_hit) if hit]
+    b_matched = [ch for ch, hit in zip(b, b_hit) if hit]
+    transpositions = sum(x != y for x, y in zip(a_matched, b_matched)) / 2
+    jaro = (matches / len(a) + matches / len(b) + (matches - transpositions) / matches) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+
+def shingles(text: str, k: int = SHINGLE_SIZE) -> set:
+    text = "".join(c for c in text.lower() if c.isalnum())
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def minhash_bands(items: set):
+    """MINHASH_BANDS band signatures; similar sets share a band with high probability."""
+    if not items:
+        return []
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in items]
+    sig = [min((seed * h + seed) % _PRIME for h in hashes) for seed in _MINHASH_SEEDS]
+    return [tuple(sig[b * MINHASH_ROWS:(b + 1) * MINHASH_ROWS]) for b in range(MINHASH_BANDS)]
+
+
+# ----------------------------
+# Leads
+# ----------------------------
+def prepare(first, last, email, phone, address, zipc):
+    """The comparable parts of one lead (inputs already normalized by lead_normalize)."""
+    first = (first or "").strip().lower()
+    last = (last or "").strip().lower()
+    local, _, domain = (email or "").partition("@")
+    return {
+        "first": NICKNAMES.get(first, first),
+        "last": last,
+        "name": f"{NICKNAMES.get(first, first)} {last}".strip(),
+        "local": local,
+        "domain": domain,
+        "phone": phone or "",
+        "address": (address or "").strip().lower(),
+        "zip": (zipc or "").strip()[:5],
+    }
+
+
+def blocking_keys(lead):
+    keys = []
+    if lead["last"]:
+        keys.append(("sx", soundex(lead["last"]), lead["zip"][:3]))
+    for i, band in enumerate(minhash_bands(shingles(lead["local"]))):
+        keys.append(("mh", i) + band)
+    return keys
+
+
+def candidate_pairs(leads):
+    """(i, j) with i < j for leads that share a blocking key and sit within BLOCK_WINDOW of each other in it."""
+    blocks = defaultdict(list)
+    for i, lead in enumerate(leads):
+        for key in blocking_keys(lead):
+            blocks[key].append(i)
+
+    pairs = set()
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        ordered = sorted(members, key=lambda i: (leads[i]["name"], leads[i]["local"], i))
+        for x, i in enumerate(ordered):
+            for j in ordered[x + 1:x + 1 + BLOCK_WINDOW]:
+                pairs.add((min(i, j), max(i, j)))
+    return pairs
+
+
+def first_names_conflict(a, b) -> bool:
+    """Both leads have a first name and they differ (nicknames are already resolved; "J" fits "John")."""
+    x, y = a["first"].rstrip("."), b["first"].rstrip(".")
+    if not x or not y or x == y:
+        return False
+    if len(x) == 1 or len(y) == 1:
+        return x[0] != y[0]
+    return True
+
+
+def score_pair(a, b, threshold: float = 0.0) -> float:
+    """
+    0..1; weighted similarity over the fields both leads have.
+    0.0 when something says they're different people (see the module docstring)
+    or nothing but the name says they're the same one.
+    Returns 0.0 early once the exact fields (phone, zip) rule out reaching threshold.
+    """
+    parts = []      # (weight, similarity)
+    fuzzy = 0.5     # weight still to score with string similarity (name, then local part / address)
+    evidence = False
+    if a["phone"] and b["phone"]:
+        if a["phone"] == b["phone"]:
+            sim = 1.0
+        elif a["phone"][-7:] == b["phone"][-7:]:
+            sim = 0.7
+        else:
+            return 0.0
+        parts.append((0.15, sim))
+        evidence = True
+    if a["zip"] and b["zip"]:
+        parts.append((0.1, 1.0 if a["zip"] == b["zip"] else 0.0))
+    has_local = bool(a["local"] and b["local"])
+    has_address = bool(a["address"] and b["address"])
+    fuzzy += 0.25 * has_local + 0.1 * has_address
+    total = fuzzy + sum(w for w, _ in parts)
+    if (fuzzy + sum(w * s for w, s in parts)) / total < threshold:
+        return 0.0
+
+    if first_names_conflict(a, b):
+        return 0.0
+    name = jaro_winkler(a["name"], b["name"])
+    if name < NAME_GATE:
+        return 0.0
+    parts.append((0.5, name))
+    if has_local:
+        sim = jaro_winkler(a["local"], b["local"])
+        if sim < EVIDENCE_SIM:
+            return 0.0
+        evidence = True
+        if a["domain"] != b["domain"]:
+            sim *= 0.9
+        parts.append((0.25, sim))
+    if has_address:
+        sim = jaro_winkler(a["address"], b["address"])
+        evidence = evidence or sim >= EVIDENCE_SIM
+        parts.append((0.1, sim))
+    if not evidence:
+        return 0.0
+    return sum(w * s for w, s in parts) / total
+
+
+def find_duplicates(leads, threshold: float = MATCH_THRESHOLD):
+    """
+    leads: list from prepare().
+    Returns {index: (index it duplicates, score)}. Each duplicate links to
+    its best-scoring earlier lead, followed through to a lead that isn't a
+    duplicate itself.
+    """
+    best = {}
+    for i, j in candidate_pairs(leads):
+        score = score_pair(leads[i], leads[j], threshold)
+        if score >= threshold and (j not in best or (score, -i) > (best[j][1], -best[j][0])):
+            best[j] = (i, score)
+
+    links = {}
+    for j in sorted(best):
+        i, score = best[j]
+        links[j] = (links[i][0] if i in links else i, score)
+    return links
+
+
+# ----------------------------
+# Exact linkage
+# ----------------------------
+class UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: int, b: int):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+
+
+def connected_components(id_lists, weak_id_lists=None):
+    """
+    id_lists[i]: the identifiers of record i (e.g. "email:..", "phone:..").
+    Records sharing an identifier, directly or through other records, land in
+    one component.
+
+    weak_id_lists[i]: identifiers (e.g. name+zip) that only join two
+    components when they don't conflict: they must not both carry an
+    identifier of the same kind (the part before ":"), since two different
+    emails or two different phones mean two different people.
+
+    Returns components as sorted index lists, ordered by their first index.
+    """
+    uf = UnionFind(len(id_lists))
+    first_seen = {}
+    for i, ids in enumerate(id_lists):
+        for ident in ids:
+            j = first_seen.setdefault(ident, i)
+            if j != i:
+                uf.union(i, j)
+
+    if weak_id_lists:
+        kinds = defaultdict(set)     # component root -> kinds of identifier it carries
+        for i, ids in enumerate(id_lists):
+            kinds[uf.find(i)].update(ident.partition(":")[0] for ident in ids)
+        groups = defaultdict(list)   # weak identifier -> roots of the components holding it
+        for i, weak_ids in enumerate(weak_id_lists):
+            for ident in weak_ids:
+                root = uf.find(i)
+                for other in groups[ident]:
+                    other = uf.find(other)
+                    if other == root:
+                        break
+                    if not kinds[root] & kinds[other]:
+                        merged = kinds.pop(root) | kinds.pop(other)
+                        uf.union(root, other)
+                        root = uf.find(root)
+                        kinds[root] = merged
+                        break
+                else:
+                    groups[ident].append(root)
+
+    components = defaultdict(list)
+    for i in range(len(id_lists)):
+        components[uf.find(i)].append(i)
+    return sorted(components.values(), key=lambda c: c[0])
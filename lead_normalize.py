@@ -0,0 +1,137 @@
+"""
+Email / phone / name normalization shared by every script, so a lead
+normalizes the same way whichever script touches it.
+
+The scalar functions are memoized (lead sheets repeat the same names and
+junk values a lot). The column functions take a whole column: names are
+worked out once per distinct value, and emails / phones are cleaned in
+one pass over the column's cells joined together:
+
+    emails = normalize_emails(column(rows, header_map.get("email")))
+"""
+import re
+from functools import lru_cache
+
+EMAIL_RE = re.compile(r"\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}\b", re.I)
+NON_DIGIT_RE = re.compile(r"\D")
+# The email / phone column functions join cells with _SEP and work on the whole text.
+_SEP = "\n"
+_BULK_NON_DIGIT_RE = re.compile(r"[^\d\n]")
+_ASCII_NON_DIGITS = bytes(b for b in range(256) if not (48 <= b <= 57 or b == ord(_SEP)))
+# EMAIL_RE on lowercased text, anchored so every line gives exactly one (maybe empty) match
+_LINE_EMAIL_RE = re.compile(r"^(?:[^\n]*?\b([a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,})\b)?", re.M)
+
+MEMO_SIZE = 1 << 16
+
+
+def _key(x) -> str:
+    return str(x) if x else ""
+
+
+# ----------------------------
+# One value
+# ----------------------------
+@lru_cache(maxsize=MEMO_SIZE)
+def _normalize_email(x: str) -> str:
+    m = EMAIL_RE.search(x.strip())
+    return m.group(0).lower() if m else ""
+
+
+def normalize_email(x) -> str:
+    """First email address in the cell, lowercased ("" if there isn't one)."""
+    return _normalize_email(_key(x)) if x else ""
+
+
+def _phone_from_digits(digits: str) -> str:
+    if len(digits) == 11 and digits.startswith("1"):
+        digits = digits[1:]
+    return digits if len(digits) == 10 else ""
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _normalize_phone(x: str) -> str:
+    return _phone_from_digits(NON_DIGIT_RE.sub("", x))
+
+
+def normalize_phone(x) -> str:
+    """10 US digits, dropping a leading 1 ("" if it isn't a US number)."""
+    return _normalize_phone(_key(x)) if x else ""
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _titlecase_name(x: str) -> str:
+    return x.strip().title()
+
+
+def titlecase_name(x) -> str:
+    return _titlecase_name(_key(x)) if x else ""
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _split_name(full: str):
+    parts = full.split()
+    if not parts:
+        return "", ""
+    if len(parts) == 1:
+        return parts[0].title(), ""
+    return parts[0].title(), " ".join(parts[1:]).title()
+
+
+def split_name(full):
+    """"mary ann smith" -> ("Mary", "Ann Smith")"""
+    return _split_name(_key(full)) if full else ("", "")
+
+
+# ----------------------------
+# Whole columns
+# ----------------------------
+def column(rows, idx):
+    """Cells of column idx (0-based) for every row; "" where the row is short or idx is None."""
+    if idx is None:
+        return [""] * len(rows)
+    return [row[idx] if idx < len(row) else "" for row in rows]
+
+
+def _map_distinct(fn, values):
+    memo = {v: fn(v) for v in dict.fromkeys(values)}
+    return [memo[v] for v in values]
+
+
+def _joined(values):
+    """Every value's text joined by _SEP, or None if a value contains _SEP."""
+    text = _SEP.join([str(v) if v else "" for v in values])
+    if text.count(_SEP) != len(values) - 1:
+        return None
+    return text
+
+
+def normalize_emails(values):
+    values = list(values)
+    text = _joined(values)
+    if not values or text is None or not text.isascii():
+        return _map_distinct(normalize_email, values)
+    # one pass over the whole column: the first email on each line (or "")
+    return _LINE_EMAIL_RE.findall(text.lower())
+
+
+def normalize_phones(values):
+    values = list(values)
+    text = _joined(values)
+    if not values or text is None:
+        return _map_distinct(normalize_phone, values)
+    if text.isascii():
+        digits = text.encode("ascii").translate(None, _ASCII_NON_DIGITS).decode("ascii")
+    else:
+        digits = _BULK_NON_DIGIT_RE.sub("", text)
+    return [
+        d if len(d) == 10 else d[1:] if len(d) == 11 and d[0] == "1" else ""
+        for d in digits.split(_SEP)
+    ]
+
+
+def titlecase_names(values):
+    return _map_distinct(titlecase_name, values)
+
+
+def split_names(values):
+    return _map_distinct(split_name, values)
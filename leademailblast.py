@@ -1,21 +1,31 @@
 import os
 import time
 import base64
+import hashlib
 import re
-from datetime import datetime
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date
+from functools import lru_cache
+from itertools import chain
+from email.header import Header
 from dotenv import load_dotenv
 from email.mime.image import MIMEImage
 
-from google.oauth2.credentials import Credentials
-from google.oauth2 import service_account
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from google.auth.exceptions import RefreshError
 
-count = 0
+from fingerprint_cache import fingerprint
+from google_clients import gmail_service, sheets_service
+from google_retry import execute
+from header_schema import FIELD_ALIASES, infer_columns
+from lead_normalize import normalize_email, normalize_phone, split_name, titlecase_name
+from send_journal import SendJournal
+
 BUSINESS_CARD_PATH = r"images\\JC_BusinessCard.png"
+EMAIL_SUBJECT = "Something I noticed in your file..."
 
 # --- Load environment variables ---
 load_dotenv()
@@ -28,121 +38,84 @@ SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
 # --- Gmail API (OAuth2) ---
 GMAIL_SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
 
-def authenticate_gmail():
+def _run_gmail_oauth_flow(token_path="token.json"):
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    flow = InstalledAppFlow.from_client_secrets_file("credentials.json", GMAIL_SCOPES)
+    creds = flow.run_local_server(port=0)
+    with open(token_path, "w") as token:
+        token.write(creds.to_json())
+    return creds
+
+@lru_cache(maxsize=None)
+def load_gmail_credentials(token_path="token.json"):
+    from google.oauth2.credentials import Credentials
     creds = None
 
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", GMAIL_SCOPES)
+    if os.path.exists(token_path):
+        creds = Credentials.from_authorized_user_file(token_path, GMAIL_SCOPES)
 
     try:
         if not creds or not creds.valid:
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", GMAIL_SCOPES)
-            creds = flow.run_local_server(port=0)
-            with open("token.json", "w") as token:
-                token.write(creds.to_json())
-
-        return build("gmail", "v1", credentials=creds)
+            creds = _run_gmail_oauth_flow(token_path)
+        return creds
 
     except RefreshError:
         # token is revoked/broken -> delete + re-auth
-        if os.path.exists("token.json"):
-            os.remove("token.json")
+        if os.path.exists(token_path):
+            os.remove(token_path)
+        return _run_gmail_oauth_flow(token_path)
 
-        flow = InstalledAppFlow.from_client_secrets_file("credentials.json", GMAIL_SCOPES)
-        creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
+def authenticate_gmail():
+    return gmail_service(load_gmail_credentials())
 
-        return build("gmail", "v1", credentials=creds)
+def gmail_service_factory(creds=None):
+    """
+    Returns a zero-arg callable that builds a Gmail service.
+    Service objects aren't thread-safe, so each send worker builds its own.
+    """
+    creds = creds or load_gmail_credentials()
+    return lambda: gmail_service(creds)
 
 # --- Google Sheets API (Service Account) ---
-SHEETS_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
-SERVICE_ACCOUNT_FILE = "sheet_service_account.json"
+# sheets_service() comes from google_clients (sheet_service_account.json)
 
 # ✅ Edit these and press ▶ in VS Code
 TARGET_SHEET_NAME = "testsheet"
-TARGET_RANGE = "A1:ZZ"
-
-# ✅ Header aliases (added "number" under phone)
-ALIASES = {
-    "first_name": ["first", "first name", "firstname", "fname", "given name"],
-    "last_name": ["last", "last name", "lastname", "lname", "surname", "family name"],
-    "full_name": ["name", "full name", "fullname", "client name", "prospect name"],
-    "email": ["email", "e-mail", "email address", "mail"],
-    "phone": ["phone", "phone number", "number", "mobile", "cell", "cell phone", "telephone", "tel", "contact number"],
-    "email_sent": ["email_sent", "email sent", "emailed", "emailed_date", "email date", "sent at", "sent_on", "sent date"],
-}
-
-EMAIL_RE = re.compile(r"\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}\b", re.I)
-
-def sheets_service():
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SHEETS_SCOPES
-    )
-    return build("sheets", "v4", credentials=creds)
+READ_PAGE_ROWS = 5000       # rows per batchGet page when streaming the sheet
 
-def normalize_header(h: str) -> str:
-    h = (h or "").strip().lower()
-    h = re.sub(r"[\s\-_]+", " ", h)
-    h = re.sub(r"[^a-z0-9 ]+", "", h)
-    return h
+# Send engine: token bucket in messages/second + a daily cap, shared by a worker pool
+SEND_RATE_PER_SECOND = 0.5  # sustained send rate
+SEND_BURST = 1              # how many sends may go out back-to-back
+DAILY_SEND_CAP = 50         # stop after this many sends per day, across runs (None = no cap)
+SEND_WORKERS = 4            # concurrent Gmail connections
 
-def build_header_map(header_row):
-    headers = [normalize_header(h) for h in header_row]
-    idx = {}
-
-    # exact match
-    for field, aliases in ALIASES.items():
-        for i, h in enumerate(headers):
-            if h in aliases:
-                idx[field] = i
-                break
+# Several Gmail accounts (one OAuth token file each) to spread a campaign across.
+# Leave empty to send from token.json with the settings above.
+# ex: {"token": "token_sales2.json", "rate": 0.5, "daily_cap": 400, "workers": 2}
+GMAIL_ACCOUNTS = []
 
-    # contains match
-    for field, aliases in ALIASES.items():
-        if field in idx:
-            continue
-        for i, h in enumerate(headers):
-            for a in aliases:
-                if a in h:
-                    idx[field] = i
-                    break
-            if field in idx:
-                break
+# "single" = one HTTP request per email, "batch" = BatchHttpRequest envelopes
+SEND_MODE = "single"
+GMAIL_BATCH_SIZE = 50       # sends per batch envelope (Gmail recommends <= 50)
+GMAIL_BATCH_RETRIES = 3     # times a quota-limited send is re-queued
+GMAIL_BATCH_BACKOFF = 5     # seconds to wait before re-sending quota-limited items
+
+# email_sent write-backs are buffered and flushed in one batchUpdate
+WRITE_BATCH_ROWS = 25       # flush after this many sent rows
+WRITE_BATCH_SECONDS = 30    # ...or after this many seconds since the last flush
+
+# Header aliases live in header_schema.FIELD_ALIASES (shared by every script)
+ALIASES = FIELD_ALIASES
 
-    return idx
+
+def build_header_map(header_row):
+    return infer_columns(header_row)
 
 def get_cell(row, col_idx):
     if col_idx is None:
         return ""
     return row[col_idx] if col_idx < len(row) else ""
 
-def normalize_email(x: str) -> str:
-    if not x:
-        return ""
-    m = EMAIL_RE.search(str(x).strip())
-    return m.group(0).lower() if m else ""
-
-def normalize_phone(x: str) -> str:
-    if not x:
-        return ""
-    digits = re.sub(r"\D", "", str(x))
-    if len(digits) == 11 and digits.startswith("1"):
-        digits = digits[1:]
-    return digits if len(digits) == 10 else str(x).strip()
-
-def titlecase_name(x: str) -> str:
-    return str(x).strip().title() if x else ""
-
-def split_name(full: str):
-    full = (full or "").strip()
-    if not full:
-        return "", ""
-    parts = full.split()
-    if len(parts) == 1:
-        return parts[0].title(), ""
-    return parts[0].title(), " ".join(parts[1:]).title()
-
 def col_index_to_letter(idx0: int) -> str:
     n = idx0 + 1
     letters = ""
@@ -154,36 +127,174 @@ def col_index_to_letter(idx0: int) -> str:
 def now_timestamp_local():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def read_sheet_rows(sheets_svc):
-    rng = f"'{TARGET_SHEET_NAME}'!{TARGET_RANGE}"
-    result = sheets_svc.spreadsheets().values().get(
+def read_header_row(sheets_svc, sheet_name=None):
+    result = execute(sheets_svc.spreadsheets().values().get(
         spreadsheetId=SPREADSHEET_ID,
-        range=rng
-    ).execute()
-    return result.get("values", [])
-
-def update_cell(sheets_svc, col_idx0: int, row_number_1based: int, value: str):
-    col_letter = col_index_to_letter(col_idx0)
-    a1 = f"'{TARGET_SHEET_NAME}'!{col_letter}{row_number_1based}"
-    sheets_svc.spreadsheets().values().update(
+        range=f"'{sheet_name or TARGET_SHEET_NAME}'!1:1"
+    ), "read")
+    values = result.get("values", [])
+    return values[0] if values else []
+
+def sheet_row_count(sheets_svc, sheet_name=None):
+    meta = execute(sheets_svc.spreadsheets().get(
         spreadsheetId=SPREADSHEET_ID,
-        range=a1,
-        valueInputOption="RAW",
-        body={"values": [[value]]}
-    ).execute()
+        ranges=[f"'{sheet_name or TARGET_SHEET_NAME}'"],
+        fields="sheets.properties.gridProperties.rowCount"
+    ), "read")
+    return meta["sheets"][0]["properties"]["gridProperties"]["rowCount"]
+
+def iter_projected_rows(sheets_svc, col_indices, start_row: int = 2, page_size: int = READ_PAGE_ROWS,
+                        end_row=None, sheet_name=None):
+    """
+    Streams (row_number_1based, row) for only the given columns, one batchGet per page.
+    `row` keeps the sheet's column positions (unfetched columns are ""), so
+    get_cell(row, header_map[...]) works the same as on a full read.
+    """
+    sheet_name = sheet_name or TARGET_SHEET_NAME
+    cols = sorted({c for c in col_indices if c is not None})
+    if not cols:
+        return
+    width = cols[-1] + 1
+    last_row = end_row if end_row is not None else sheet_row_count(sheets_svc, sheet_name)
+
+    for page_start in range(start_row, last_row + 1, page_size):
+        page_end = min(page_start + page_size - 1, last_row)
+        ranges = [
+            f"'{sheet_name}'!{col_index_to_letter(c)}{page_start}:{col_index_to_letter(c)}{page_end}"
+            for c in cols
+        ]
+        result = execute(sheets_svc.spreadsheets().values().batchGet(
+            spreadsheetId=SPREADSHEET_ID,
+            ranges=ranges,
+            majorDimension="COLUMNS"
+        ), "read")
+
+        columns = []
+        for vr in result.get("valueRanges", []):
+            values = vr.get("values", [])
+            columns.append(values[0] if values else [])
+
+        for offset in range(page_end - page_start + 1):
+            row = [""] * width
+            for c, col_values in zip(cols, columns):
+                if offset < len(col_values):
+                    row[c] = col_values[offset]
+            yield page_start + offset, row
+
+class ScanWatermark:
+    """
+    Tracks how far through the sheet this run got.
+    Rows count as done once they're skipped (no email / already sent) or sent;
+    leads that were pulled but not sent (cap, failure) hold the watermark below them.
+    Only rows with data move it, so rows appended into blank rows are still picked up.
+    """
 
-def ensure_email_sent_column_exists(rows, header_map, sheets_svc):
+    def __init__(self, anchor_cols):
+        self.anchor_cols = anchor_cols
+        self.last_data = None   # (row_number_1based, anchor hash) of the last row with data
+        self.prev = None        # (row_number_1based, anchor hash) of the row before the current one
+        self.current = None
+        self.pending = {}       # lead row -> (row before it, anchor hash of that row)
+
+    def anchor_of(self, row):
+        return fingerprint(get_cell(row, c) for c in self.anchor_cols)
+
+    def track_rows(self, numbered_rows):
+        for row_number_1based, row in numbered_rows:
+            self.prev, self.current = self.current, (row_number_1based, self.anchor_of(row))
+            if any(str(c).strip() for c in row):
+                self.last_data = self.current
+            yield row_number_1based, row
+
+    def track_leads(self, leads):
+        for lead in leads:
+            self.pending[lead[0]] = self.prev
+            yield lead
+
+    def done(self, row_number_1based: int):
+        self.pending.pop(row_number_1based, None)
+
+    def position(self):
+        """(last fully processed row, anchor hash of that row), or None if nothing new is known."""
+        if self.pending:
+            return self.pending[min(self.pending)]
+        return self.last_data
+
+def resolve_start_row(sheets_svc, journal, header, anchor_cols):
+    """
+    First row to scan. Resumes after the saved watermark unless the header
+    changed or the watermark row no longer holds the same lead (rows were
+    inserted/deleted above it), in which case we fall back to a full scan.
+    """
+    saved = journal.get_watermark(TARGET_SHEET_NAME)
+    if not saved:
+        return 2
+    last_row, header_hash, anchor_hash = saved
+    if header_hash != fingerprint(header):
+        print("↻ Header changed since last run; scanning the whole sheet.")
+        return 2
+    if last_row < 2:
+        return 2
+    anchor_row = next(iter_projected_rows(sheets_svc, anchor_cols, start_row=last_row, end_row=last_row), None)
+    if anchor_row is None or fingerprint(get_cell(anchor_row[1], c) for c in anchor_cols) != anchor_hash:
+        print("↻ Rows changed above the last processed row; scanning the whole sheet.")
+        return 2
+    return last_row + 1
+
+class SentWriteBuffer:
+    """
+    Collects (row, email_sent timestamp) pairs and writes them back with a
+    single values().batchUpdate call instead of one update() per lead.
+    """
+
+    def __init__(self, sheets_svc, col_idx0: int,
+                 max_rows: int = WRITE_BATCH_ROWS, max_seconds: float = WRITE_BATCH_SECONDS,
+                 on_flush=None, sheet_name=None):
+        self.sheets_svc = sheets_svc
+        self.sheet_name = sheet_name or TARGET_SHEET_NAME
+        self.on_flush = on_flush    # called with the flushed row numbers
+        self.col_letter = col_index_to_letter(col_idx0)
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.flush_count = 0
+
+    def add(self, row_number_1based: int, value: str):
+        self.pending.append((row_number_1based, value))
+        if len(self.pending) >= self.max_rows or time.monotonic() - self.last_flush >= self.max_seconds:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.pending:
+            return
+        data = [
+            {"range": f"'{self.sheet_name}'!{self.col_letter}{row_number_1based}", "values": [[value]]}
+            for row_number_1based, value in self.pending
+        ]
+        execute(self.sheets_svc.spreadsheets().values().batchUpdate(
+            spreadsheetId=SPREADSHEET_ID,
+            body={"valueInputOption": "RAW", "data": data}
+        ), "write")
+        self.flush_count += 1
+        print(f"📝 Wrote {len(self.pending)} email_sent timestamps to the sheet.")
+        if self.on_flush:
+            self.on_flush([row_number_1based for row_number_1based, _ in self.pending])
+        self.pending = []
+
+def ensure_email_sent_column_exists(rows, header_map, sheets_svc, sheet_name=None):
     header = rows[0] if rows else []
     if "email_sent" in header_map:
         return header_map, header
 
     new_header = header[:] + ["email_sent"]
-    sheets_svc.spreadsheets().values().update(
+    execute(sheets_svc.spreadsheets().values().update(
         spreadsheetId=SPREADSHEET_ID,
-        range=f"'{TARGET_SHEET_NAME}'!A1",
+        range=f"'{sheet_name or TARGET_SHEET_NAME}'!A1",
         valueInputOption="RAW",
         body={"values": [new_header]}
-    ).execute()
+    ), "write")
 
     header_map = build_header_map(new_header)
     return header_map, new_header
@@ -201,35 +312,74 @@ def format_phone_us(digits: str) -> str:
 
 
 # --- Gmail Functions ---
-def create_message(to, subject, body_html, image_path=None):
-    message = MIMEMultipart("related")
-    message["to"] = to
-    message["subject"] = subject
+class MessageTemplate:
+    """
+    Pre-built MIME skeleton for one subject + inline business card.
+
+    The image part is read, checked and base64url-encoded once. Per recipient
+    only the headers and the HTML part are built; that head is padded to a
+    multiple of 3 bytes so its base64 can be joined with the cached image base64.
+    """
 
-    alternative = MIMEMultipart("alternative")
-    message.attach(alternative)
+    def __init__(self, subject, image_path=None):
+        self.boundary = "===============" + uuid.uuid4().hex + "=="
+        self.alt_boundary = "===============" + uuid.uuid4().hex + "=="
 
-    alternative.attach(MIMEText(body_html, "html", "utf-8"))
+        try:
+            subject.encode("ascii")
+            self.subject_header = subject
+        except UnicodeEncodeError:
+            self.subject_header = Header(subject, "utf-8").encode()
 
-    # Attach image inline (CID)
-    if image_path:
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Business card image not found: {image_path}")
+        tail = b""
+        if image_path:
+            # Attach image inline (CID)
+            if not os.path.exists(image_path):
+                raise FileNotFoundError(f"Business card image not found: {image_path}")
 
-        with open(image_path, "rb") as f:
-            img = MIMEImage(f.read())
+            with open(image_path, "rb") as f:
+                img = MIMEImage(f.read())
             img.add_header("Content-ID", "<businesscard>")
             img.add_header("Content-Disposition", "inline", filename=os.path.basename(image_path))
-            message.attach(img)
+            tail = b"\n--" + self.boundary.encode() + b"\n" + img.as_bytes()
+        tail += b"\n--" + self.boundary.encode() + b"--\n"
+        self.tail_b64 = base64.urlsafe_b64encode(tail).decode()
+
+    def render(self, to, body_html):
+        html_b64 = base64.encodebytes(body_html.encode("utf-8")).decode("ascii")
+        head = (
+            f'Content-Type: multipart/related; boundary="{self.boundary}"\n'
+            "MIME-Version: 1.0\n"
+            f"to: {to}\n"
+            f"subject: {self.subject_header}\n"
+            "\n"
+            f"--{self.boundary}\n"
+            f'Content-Type: multipart/alternative; boundary="{self.alt_boundary}"\n'
+            "MIME-Version: 1.0\n"
+            "\n"
+            f"--{self.alt_boundary}\n"
+            'Content-Type: text/html; charset="utf-8"\n'
+            "MIME-Version: 1.0\n"
+            "Content-Transfer-Encoding: base64\n"
+            "\n"
+            f"{html_b64}"
+            f"\n--{self.alt_boundary}--\n"
+        ).encode("utf-8")
+        # extra newlines land in the alternative part's epilogue, which is ignored
+        head += b"\n" * (-len(head) % 3)
+        raw = base64.urlsafe_b64encode(head).decode() + self.tail_b64
+        return {"raw": raw}
+
+@lru_cache(maxsize=None)
+def get_message_template(subject, image_path=None):
+    return MessageTemplate(subject, image_path)
 
-    raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
-    return {"raw": raw}
+def create_message(to, subject, body_html, image_path=None):
+    return get_message_template(subject, image_path).render(to, body_html)
 
 
 
-def send_email(gmail_service, to_name, to_email, to_phone):
-    subject = "Something I noticed in your file..."
-
+def build_email_message(to_name, to_email, to_phone):
     body_html = f"""
     <html>
       <body style="font-family: Arial, Helvetica, sans-serif; font-size: 14px; color: #000; line-height: 1.6;">
@@ -288,63 +438,79 @@ def send_email(gmail_service, to_name, to_email, to_phone):
     </html>
     """
 
-    msg = create_message(to_email, subject, body_html, image_path=BUSINESS_CARD_PATH)
-    gmail_service.users().messages().send(userId="me", body=msg).execute()
-
-# --- Run Program ---
-if __name__ == "__main__":
-    gmail_service = authenticate_gmail()
-    sheets_svc = sheets_service()
-
-    rows = read_sheet_rows(sheets_svc)
-    if not rows or len(rows) < 2:
-        raise RuntimeError("Sheet is empty or missing data rows.")
-
-    header = rows[0]
-    header_map = build_header_map(header)
-
-    if "email" not in header_map:
-        raise RuntimeError(
-            f"Couldn't find an EMAIL column in '{TARGET_SHEET_NAME}'.\n"
-            f"Header row was: {header}\n"
-            f"Rename header to one of: {ALIASES['email']}"
-        )
+    return create_message(to_email, EMAIL_SUBJECT, body_html, image_path=BUSINESS_CARD_PATH)
 
-    if "phone" not in header_map:
-        raise RuntimeError(
-            f"Couldn't find a PHONE column in '{TARGET_SHEET_NAME}'.\n"
-            f"Header row was: {header}\n"
-            f"Rename header to one of: {ALIASES['phone']}"
-        )
+def send_email(gmail_service, to_name, to_email, to_phone):
+    msg = build_email_message(to_name, to_email, to_phone)
+    execute(gmail_service.users().messages().send(userId="me", body=msg), "send")
 
-    # Ensure email_sent exists
-    header_map, header = ensure_email_sent_column_exists(rows, header_map, sheets_svc)
+# --- Send engine ---
+class SendRateLimiter:
+    """
+    Token bucket (rate tokens/second, up to burst) with an optional daily cap.
+    acquire() blocks until a token is available and returns False once the cap is hit.
+    """
 
+    def __init__(self, rate_per_second: float, burst: int = 1, daily_cap=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate_per_second)
+        self.capacity = max(1, int(burst))
+        self.daily_cap = daily_cap
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(self.capacity)
+        self.updated = clock()
+        self.day = date.today()
+        self.sent_today = 0
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _roll_day(self):
+        today = date.today()
+        if today != self.day:
+            self.day, self.sent_today = today, 0
+
+    def count_earlier_sends(self, n: int):
+        """Counts n sends already made today (by earlier runs, see SendJournal.sends_on) against the daily cap."""
+        with self.lock:
+            self._roll_day()
+            self.sent_today = max(self.sent_today, n)
+
+    def acquire(self) -> bool:
+        while True:
+            with self.lock:
+                self._roll_day()
+                if self.daily_cap is not None and self.sent_today >= self.daily_cap:
+                    return False
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.sent_today += 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+def iter_unsent_leads(numbered_rows, header_map, skip_email=None, with_rows=False):
+    """
+    Takes (row_number_1based, row) pairs (see iter_projected_rows) and
+    yields (row_number_1based, name_for_greeting, email, to_phone) for every unsent row.
+    Rows marked as a duplicate of another lead (duplicate_of, see lead_dedupe) are skipped.
+    skip_email(email) -> True drops rows already handled elsewhere (e.g. in the send journal).
+    with_rows: yield (lead, row) instead, for callers that need other columns of the row.
+    """
     first_idx = header_map.get("first_name")
     last_idx = header_map.get("last_name")
     full_idx = header_map.get("full_name")
     email_idx = header_map.get("email")
     phone_idx = header_map.get("phone")
     email_sent_idx = header_map.get("email_sent")
+    duplicate_idx = header_map.get("duplicate_of")
 
-    print("✅ Detected header mapping:", header_map)
-
-    # Find first unsent row
-    start_row_number_1based = None
-    for row_number_1based, row in enumerate(rows[1:], start=2):
-        sent_val = str(get_cell(row, email_sent_idx)).strip()
-        email_val = normalize_email(get_cell(row, email_idx))
-        if email_val and not sent_val:
-            start_row_number_1based = row_number_1based
-            break
-
-    if start_row_number_1based is None:
-        print("✅ No unsent leads found (everyone has email_sent filled).")
-        raise SystemExit(0)
-
-    print(f"▶ Starting from first unsent lead at row {start_row_number_1based}...")
-
-    for row_number_1based, row in enumerate(rows[start_row_number_1based - 1:], start=start_row_number_1based):
+    for row_number_1based, row in numbered_rows:
         email = normalize_email(get_cell(row, email_idx))
         if not email:
             continue
@@ -353,13 +519,20 @@ if __name__ == "__main__":
         if sent_val:
             continue
 
+        if str(get_cell(row, duplicate_idx)).strip():
+            continue
+
+        if skip_email and skip_email(email):
+            continue
+
         first = titlecase_name(get_cell(row, first_idx)) if first_idx is not None else ""
         last = titlecase_name(get_cell(row, last_idx)) if last_idx is not None else ""
         if (not first and not last) and full_idx is not None:
             first, last = split_name(get_cell(row, full_idx))
         name_for_greeting = first or "there"
 
-        raw_phone = normalize_phone(get_cell(row, phone_idx))
+        cell = get_cell(row, phone_idx)
+        raw_phone = normalize_phone(cell) or str(cell).strip()
         to_phone = format_phone_us(raw_phone)
 
         if not to_phone:
@@ -367,14 +540,498 @@ if __name__ == "__main__":
             # continue
             to_phone = "your current number"
 
-        send_email(gmail_service, name_for_greeting, email, to_phone)
+        lead = (row_number_1based, name_for_greeting, email, to_phone)
+        yield (lead, row) if with_rows else lead
+
+def send_leads(service_factory, leads, limiter, on_sent, workers: int = SEND_WORKERS,
+               before_send=None, on_failed=None):
+    """
+    Sends every lead through a pool of workers, each with its own Gmail service.
+    The limiter decides how fast sends start; on_sent(lead, ts) is called in lead
+    order, so rows are marked sent in order even if sends finish out of order.
+    before_send(lead) / on_failed(lead, exc) run on the calling thread.
+    If a send fails, no new sends are started, in-flight ones are drained and
+    marked, and the first error is re-raised. Returns the number of leads sent.
+    """
+    local = threading.local()
+
+    def worker(lead):
+        if not hasattr(local, "service"):
+            local.service = service_factory()
+        _, name_for_greeting, email, to_phone = lead
+        send_email(local.service, name_for_greeting, email, to_phone)
+        return now_timestamp_local()
+
+    sent = 0
+    first_error = None
+    in_flight = deque()
+
+    def drain_one():
+        nonlocal sent, first_error
+        lead, fut = in_flight.popleft()
+        try:
+            ts = fut.result()
+        except Exception as e:
+            print(f"❌ Failed to send to {lead[2]} (row {lead[0]}): {e}")
+            if on_failed:
+                on_failed(lead, e)
+            if first_error is None:
+                first_error = e
+            return
+        sent += 1
+        on_sent(lead, ts)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for lead in leads:
+            if first_error is not None:
+                break
+            # keep the queue short so a failure or the daily cap stops us quickly
+            while len(in_flight) >= workers:
+                drain_one()
+            if first_error is not None or not limiter.acquire():
+                break
+            if before_send:
+                before_send(lead)
+            in_flight.append((lead, pool.submit(worker, lead)))
+        while in_flight:
+            drain_one()
+
+    if first_error is not None:
+        raise first_error
+    return sent
+
+# --- Multi-account sending ---
+class GmailAccount:
+    def __init__(self, name, service_factory, limiter, workers: int = 1):
+        self.name = name
+        self.service_factory = service_factory
+        self.limiter = limiter
+        self.workers = workers
+        self.disabled_reason = None     # set when the account hits its quota or loses auth
+
+    @property
+    def healthy(self) -> bool:
+        return self.disabled_reason is None
+
+class SenderPool:
+    """
+    Spreads leads over several Gmail accounts.
+    Each recipient is routed with rendezvous hashing on the email, so the same
+    person always gets the same sender while that account is healthy (keeps
+    reply threads in one mailbox). A disabled account's recipients move to the
+    next account in their own ranking.
+    """
 
+    def __init__(self, accounts):
+        self.accounts = list(accounts)
+
+    @classmethod
+    def from_config(cls, configs):
+        accounts = []
+        for cfg in configs:
+            token_path = cfg["token"]
+            try:
+                creds = load_gmail_credentials(token_path)
+            except RefreshError as e:
+                print(f"⚠ Skipping Gmail account {token_path}: {e}")
+                continue
+            limiter = SendRateLimiter(
+                cfg.get("rate", SEND_RATE_PER_SECOND),
+                cfg.get("burst", SEND_BURST),
+                cfg.get("daily_cap", DAILY_SEND_CAP),
+            )
+            accounts.append(GmailAccount(token_path, gmail_service_factory(creds), limiter, cfg.get("workers", 1)))
+        if not accounts:
+            raise RuntimeError("No usable Gmail accounts in GMAIL_ACCOUNTS.")
+        return cls(accounts)
+
+    def ranked(self, email: str):
+        def score(account):
+            return hashlib.sha1(f"{account.name}|{email}".encode("utf-8")).digest()
+        return sorted(self.accounts, key=score, reverse=True)
+
+    def route(self, email: str):
+        """Healthy account with a send token for this recipient, or None when every account is done."""
+        for account in self.ranked(email):
+            if not account.healthy:
+                continue
+            if account.limiter.acquire():
+                return account
+            account.disabled_reason = f"daily cap of {account.limiter.daily_cap} reached"
+            print(f"⏸ {account.name}: {account.disabled_reason}")
+        return None
+
+    @property
+    def total_workers(self) -> int:
+        return sum(a.workers for a in self.accounts)
+
+def send_leads_sharded(pool, leads, on_sent, before_send=None, on_failed=None):
+    """
+    Like send_leads(), but every lead goes out through the account pool.route() picks.
+    A quota error or RefreshError disables that account and the lead is retried on
+    another one; other per-recipient errors (including unconfirmed 5xx sends,
+    which are never resent) are reported and the run continues.
+    before_send(lead, account_name) runs on the calling thread before each send.
+    Returns {"sent": [...], "failed": [(lead, exc)], "accounts": {name: sent count}}.
+    """
+    local = threading.local()
+    result = {"sent": [], "failed": [], "accounts": {a.name: 0 for a in pool.accounts}}
+    retry = deque()
+    in_flight = deque()
+    workers = max(1, pool.total_workers)
+
+    def worker(account, lead):
+        services = local.__dict__.setdefault("services", {})
+        if account.name not in services:
+            services[account.name] = account.service_factory()
+        _, name_for_greeting, email, to_phone = lead
+        send_email(services[account.name], name_for_greeting, email, to_phone)
+        return now_timestamp_local()
+
+    def drain_one():
+        lead, account, fut = in_flight.popleft()
+        try:
+            ts = fut.result()
+        except Exception as e:
+            if isinstance(e, RefreshError) or classify_send_error(e) == "quota":
+                if account.healthy:
+                    account.disabled_reason = f"{type(e).__name__}: {e}"
+                    print(f"⚠ Disabling {account.name} for this run ({account.disabled_reason})")
+                retry.append((lead, e))
+                return
+            if classify_send_error(e) == "unconfirmed":
+                print(f"⚠ Send to {lead[2]} (row {lead[0]}) from {account.name} may have gone out ({e}); "
+                      f"not resending. Check the Sent folder.")
+            else:
+                print(f"❌ Failed to send to {lead[2]} (row {lead[0]}) from {account.name}: {e}")
+            result["failed"].append((lead, e))
+            if on_failed:
+                on_failed(lead, e)
+            return
+        result["sent"].append(lead)
+        result["accounts"][account.name] += 1
+        on_sent(lead, ts)
+
+    leads = iter(leads)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while len(in_flight) >= workers:
+                drain_one()
+            from_retry = bool(retry)
+            lead = retry[0][0] if from_retry else next(leads, None)
+            if lead is None:
+                if not in_flight:
+                    break
+                drain_one()
+                continue
+            account = pool.route(lead[2])
+            if account is None:
+                print("⏸ Every Gmail account is capped or disabled; stopping.")
+                break
+            if from_retry:
+                retry.popleft()
+            if before_send:
+                before_send(lead, account.name)
+            in_flight.append((lead, account, executor.submit(worker, account, lead)))
+        while in_flight:
+            drain_one()
+
+    # bounced off every account and never sent
+    for lead, e in retry:
+        result["failed"].append((lead, e))
+        if on_failed:
+            on_failed(lead, e)
+
+    return result
+
+# --- Batch send mode ---
+QUOTA_REASONS = ("ratelimitexceeded", "userratelimitexceeded", "dailylimitexceeded", "quotaexceeded")
+
+def send_was_rejected(exc) -> bool:
+    """
+    True when the message definitely didn't go out: Gmail answered 4xx (rate
+    limits included) or auth failed before the request. A 5xx or a timeout
+    might still have delivered.
+    """
+    if isinstance(exc, RefreshError):
+        return True
+    return isinstance(exc, HttpError) and 400 <= (getattr(exc.resp, "status", None) or 0) < 500
+
+def classify_send_error(exc) -> str:
+    """
+    "quota": Gmail refused it for rate/quota reasons (429, rate-limit 403); safe to retry.
+    "permanent": any other rejection; nothing went out.
+    "unconfirmed": a 5xx, timeout or connection error; it may have been delivered,
+    so it must not be sent again.
+    """
+    if isinstance(exc, HttpError):
+        status = getattr(exc.resp, "status", None) or 0
+        if status == 429:
+            return "quota"
+        if status == 403 and any(r in str(exc).lower() for r in QUOTA_REASONS):
+            return "quota"
+        return "unconfirmed" if status >= 500 else "permanent"
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return "unconfirmed"
+    return "permanent"
+
+def send_leads_batched(gmail_service, leads, limiter, on_sent,
+                       batch_size: int = GMAIL_BATCH_SIZE, retries: int = GMAIL_BATCH_RETRIES,
+                       backoff: float = GMAIL_BATCH_BACKOFF, sleep=time.sleep,
+                       before_send=None, on_failed=None):
+    """
+    Sends leads in BatchHttpRequest envelopes, one callback per message.
+    on_sent(lead, ts) is only called for successful items, in lead order within
+    each batch. Quota-limited items are re-queued up to `retries` times and are
+    marked whenever their retry succeeds.
+    before_send(lead) runs before a lead's first attempt; on_failed(lead, exc)
+    runs once a lead is given up on.
+    Returns {"sent": [...], "quota": [(lead, exc)], "failed": [(lead, exc)]}.
+    """
+    result = {"sent": [], "quota": [], "failed": []}
+    retry_queue = deque()    # (lead, attempts)
+    leads = iter(leads)
+    capped = False
+
+    def next_chunk():
+        nonlocal capped
+        chunk = []
+        while retry_queue and len(chunk) < batch_size:
+            chunk.append(retry_queue.popleft())
+        while not capped and len(chunk) < batch_size:
+            lead = next(leads, None)
+            if lead is None:
+                break
+            if not limiter.acquire():
+                capped = True
+                break
+            if before_send:
+                before_send(lead)
+            chunk.append((lead, 0))
+        return chunk
+
+    while True:
+        chunk = next_chunk()
+        if not chunk:
+            break
+
+        outcomes = {}
+
+        def callback(request_id, response, exception):
+            outcomes[request_id] = exception
+
+        batch = gmail_service.new_batch_http_request()
+        for i, (lead, _) in enumerate(chunk):
+            _, name_for_greeting, email, to_phone = lead
+            msg = build_email_message(name_for_greeting, email, to_phone)
+            batch.add(
+                gmail_service.users().messages().send(userId="me", body=msg),
+                callback=callback,
+                request_id=str(i),
+            )
+        batch.execute()
         ts = now_timestamp_local()
-        update_cell(sheets_svc, email_sent_idx, row_number_1based, ts)
 
+        needs_backoff = False
+        for i, (lead, attempts) in enumerate(chunk):
+            exc = outcomes.get(str(i))
+            if exc is None:
+                result["sent"].append(lead)
+                on_sent(lead, ts)
+            elif classify_send_error(exc) == "quota" and attempts < retries:
+                retry_queue.append((lead, attempts + 1))
+                needs_backoff = True
+            elif classify_send_error(exc) == "quota":
+                print(f"⏳ Quota limit for {lead[2]} (row {lead[0]}), giving up for now: {exc}")
+                result["quota"].append((lead, exc))
+                if on_failed:
+                    on_failed(lead, exc)
+            else:
+                if classify_send_error(exc) == "unconfirmed":
+                    print(f"⚠ Send to {lead[2]} (row {lead[0]}) may have gone out ({exc}); "
+                          f"not resending. Check the Sent folder.")
+                else:
+                    print(f"❌ Failed to send to {lead[2]} (row {lead[0]}): {exc}")
+                result["failed"].append((lead, exc))
+                if on_failed:
+                    on_failed(lead, exc)
+
+        if needs_backoff:
+            sleep(backoff)
+
+    return result
+
+# --- Run Program ---
+def sync_journaled_sends(sheets_svc, journal, write_buffer, email_idx, sheet_name=None):
+    """
+    Writes the email_sent timestamp of every send the journal confirmed but
+    never synced (e.g. killed before the buffer flushed). Leads whose row
+    moved are found again by email. Returns how many sends were synced.
+    """
+    sheet_name = sheet_name or TARGET_SHEET_NAME
+    unsynced = journal.unsynced(sheet_name)
+    if not unsynced:
+        return 0
+    col = col_index_to_letter(email_idx)
+    result = execute(sheets_svc.spreadsheets().values().batchGet(
+        spreadsheetId=SPREADSHEET_ID,
+        ranges=[f"'{sheet_name}'!{col}{n}" for _, n, _ in unsynced]
+    ), "read")
+    emails_at_rows = [
+        normalize_email(vr["values"][0][0]) if vr.get("values") else ""
+        for vr in result.get("valueRanges", [])
+    ]
+    rows_by_email = None
+    for (email, row_number_1based, sent_at), email_at_row in zip(unsynced, emails_at_rows):
+        if email_at_row != email:
+            # rows moved since the send -> find the lead again
+            if rows_by_email is None:
+                rows_by_email = {
+                    normalize_email(get_cell(r, email_idx)): n
+                    for n, r in iter_projected_rows(sheets_svc, [email_idx], sheet_name=sheet_name)
+                }
+            row_number_1based = rows_by_email.get(email)
+            if row_number_1based is None:
+                continue
+            journal.move_row(email, row_number_1based)
+        write_buffer.add(row_number_1based, sent_at)
+    write_buffer.flush()
+    return len(unsynced)
+
+def run_campaign(gmail_factory, sheets_svc, journal=None, limiter=None, send_mode=None, sender_pool=None):
+    """
+    One send run against TARGET_SHEET_NAME. Returns the number of emails sent.
+    gmail_factory builds a Gmail service per worker (see gmail_service_factory);
+    with a sender_pool, leads are spread over its accounts instead.
+    """
+    # load + check the business card once, before touching any leads
+    get_message_template(EMAIL_SUBJECT, BUSINESS_CARD_PATH)
+
+    header = read_header_row(sheets_svc)
+    if not header:
+        raise RuntimeError("Sheet is empty or missing data rows.")
+
+    header_map = build_header_map(header)
+
+    if "email" not in header_map:
+        raise RuntimeError(
+            f"Couldn't find an EMAIL column in '{TARGET_SHEET_NAME}'.\n"
+            f"Header row was: {header}\n"
+            f"Rename header to one of: {ALIASES['email']}"
+        )
+
+    if "phone" not in header_map:
+        raise RuntimeError(
+            f"Couldn't find a PHONE column in '{TARGET_SHEET_NAME}'.\n"
+            f"Header row was: {header}\n"
+            f"Rename header to one of: {ALIASES['phone']}"
+        )
+
+    # Ensure email_sent exists
+    header_map, header = ensure_email_sent_column_exists([header], header_map, sheets_svc)
+
+    email_idx = header_map.get("email")
+    email_sent_idx = header_map.get("email_sent")
+    # only these columns are downloaded; anchor_cols identify the lead in a row
+    anchor_cols = [
+        header_map[f] for f in ("first_name", "last_name", "full_name", "email", "phone") if f in header_map
+    ]
+    lead_cols = anchor_cols + [email_sent_idx, header_map.get("duplicate_of")]
+
+    print("✅ Detected header mapping:", header_map)
+
+    journal = journal or SendJournal()
+    write_buffer = SentWriteBuffer(
+        sheets_svc, email_sent_idx,
+        on_flush=lambda row_numbers: journal.mark_synced(TARGET_SHEET_NAME, row_numbers),
+    )
+
+    # Reconcile: sends confirmed in the journal whose timestamp never reached the sheet
+    synced = sync_journaled_sends(sheets_svc, journal, write_buffer, email_idx)
+    if synced:
+        print(f"🔁 Synced {synced} journaled send(s) back to the sheet.")
+
+    for email, row_number_1based, intent_at in journal.pending_intents(TARGET_SHEET_NAME):
+        print(f"⚠ Send to {email} (row {row_number_1based}) started at {intent_at} but was never confirmed; "
+              f"not resending. Check the Sent folder and fix email_sent by hand.")
+
+    def save_watermark():
+        position = watermark.position()
+        if position:
+            journal.set_watermark(TARGET_SHEET_NAME, position[0], fingerprint(header), position[1])
+
+    start_row = resolve_start_row(sheets_svc, journal, header, anchor_cols)
+    if start_row > 2:
+        print(f"⏩ Resuming after row {start_row - 1} (last processed row).")
+
+    watermark = ScanWatermark(anchor_cols)
+    leads = watermark.track_leads(iter_unsent_leads(
+        watermark.track_rows(iter_projected_rows(sheets_svc, lead_cols, start_row=start_row)),
+        header_map,
+        skip_email=journal.already_attempted,
+    ))
+    first_lead = next(leads, None)
+    if first_lead is None:
+        print("✅ No unsent leads found (everyone has email_sent filled).")
+        save_watermark()
+        journal.close()
+        return 0
+
+    print(f"▶ Starting from first unsent lead at row {first_lead[0]}...")
+    leads = chain([first_lead], leads)
+
+    limiter = limiter or SendRateLimiter(SEND_RATE_PER_SECOND, SEND_BURST, DAILY_SEND_CAP)
+    # daily caps count today's sends from earlier runs too
+    today = date.today()
+    if sender_pool:
+        for account in sender_pool.accounts:
+            account.limiter.count_earlier_sends(journal.sends_on(today, account.name))
+    else:
+        limiter.count_earlier_sends(journal.sends_on(today))
+    count = 0
+
+    def before_send(lead, account=None):
+        row_number_1based, _, email, _ = lead
+        journal.record_intent(email, TARGET_SHEET_NAME, row_number_1based, account)
+
+    def on_sent(lead, ts):
+        nonlocal count
+        row_number_1based, name_for_greeting, email, to_phone = lead
+        journal.record_sent(email, ts)
+        write_buffer.add(row_number_1based, ts)
+        watermark.done(row_number_1based)
         count += 1
         print(f"✅ Sent email #{count} to {name_for_greeting} at {email} | phone={to_phone} | email_sent={ts}")
-        time.sleep(2)
 
-        if count == 50:
-            quit("Reached 50 emails sent. Stopping to avoid rate limits.")
+    def on_failed(lead, exc):
+        # Gmail rejected it (or auth failed first), so nothing went out -> allow a retry next run.
+        # Anything else stays an unconfirmed intent and is reported, never resent.
+        if send_was_rejected(exc):
+            journal.clear_intent(lead[2])
+
+    try:
+        if sender_pool:
+            result = send_leads_sharded(sender_pool, leads, on_sent, before_send=before_send, on_failed=on_failed)
+            print("📬 Sent per account:", result["accounts"])
+        elif (send_mode or SEND_MODE) == "batch":
+            result = send_leads_batched(gmail_factory(), leads, limiter, on_sent,
+                                        before_send=before_send, on_failed=on_failed)
+            if result["quota"] or result["failed"]:
+                print(f"⚠ Not sent: {len(result['quota'])} quota-limited, {len(result['failed'])} failed.")
+        else:
+            send_leads(gmail_factory, leads, limiter, on_sent, before_send=before_send, on_failed=on_failed)
+    finally:
+        # flush on normal exit, Ctrl+C or a crash
+        write_buffer.flush()
+        save_watermark()
+        journal.close()
+
+    if not sender_pool and limiter.daily_cap is not None and limiter.sent_today >= limiter.daily_cap:
+        print(f"⏸ Reached the daily cap of {limiter.daily_cap} emails. Run again tomorrow to continue.")
+    return count
+
+if __name__ == "__main__":
+    if GMAIL_ACCOUNTS:
+        run_campaign(None, sheets_service(), sender_pool=SenderPool.from_config(GMAIL_ACCOUNTS))
+    else:
+        run_campaign(gmail_service_factory(), sheets_service())
@@ -1,8 +1,13 @@
 import os
-import re
+from collections import Counter
 from dotenv import load_dotenv
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from fingerprint_cache import FingerprintCache, fingerprint
+from google_clients import sheets_service
+from google_retry import execute
+from header_schema import FIELD_ALIASES, infer_columns
+from lead_normalize import normalize_email, normalize_phone
+from sheet_writer import write_rows, write_sheets
+from us_states import USPS_CODES, normalize_state
 
 # ----------------------------
 # Config
@@ -10,115 +15,313 @@ from googleapiclient.discovery import build
 load_dotenv()
 
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID", "")
-SERVICE_ACCOUNT_FILE = "sheet_service_account.json"
-SHEETS_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
 # 👇 CHANGE THIS AND PRESS ▶ RUN
 TARGET_SHEET_NAME = "NEW TTC"
 TARGET_RANGE = "A1:ZZ"
 
-# State header aliases (add more if needed)
-STATE_ALIASES = [
-    "state", "st", "province", "region"
-]
+# "server": one sortRange request, the rows never leave Google
+# "download": read the tab, sort here, clear and rewrite it
+SORT_MODE = "server"
+
+# Sort by these fields in order; state is required, the others are used when the tab has them
+SORT_KEYS = ["state", "city", "last_name"]
+
+# partition_by_state(): one tab per state, e.g. "NEW TTC - TX"
+STATE_TAB_FORMAT = "{sheet} - {state}"
+NO_STATE = "No State"      # rows whose state isn't a US state
+
+# State header aliases (add more in header_schema.FIELD_ALIASES["state"])
+STATE_ALIASES = FIELD_ALIASES["state"]
 
 # ----------------------------
 # Sheets API
 # ----------------------------
-def sheets_service():
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SHEETS_SCOPES
-    )
-    return build("sheets", "v4", credentials=creds)
-
 def get_values(svc, sheet_name, a1_range):
     rng = f"'{sheet_name}'!{a1_range}"
-    resp = svc.spreadsheets().values().get(
+    resp = execute(svc.spreadsheets().values().get(
         spreadsheetId=SPREADSHEET_ID,
         range=rng
-    ).execute()
+    ), "read")
     return resp.get("values", [])
 
 def clear_range(svc, sheet_name, a1_range):
     rng = f"'{sheet_name}'!{a1_range}"
-    svc.spreadsheets().values().clear(
+    execute(svc.spreadsheets().values().clear(
         spreadsheetId=SPREADSHEET_ID,
         range=rng,
         body={}
-    ).execute()
+    ), "write")
 
-def update_values(svc, sheet_name, start_cell, values):
-    rng = f"'{sheet_name}'!{start_cell}"
-    svc.spreadsheets().values().update(
+def batch_clear(svc, sheet_names):
+    execute(svc.spreadsheets().values().batchClear(
         spreadsheetId=SPREADSHEET_ID,
-        range=rng,
-        valueInputOption="RAW",
-        body={"values": values}
-    ).execute()
+        body={"ranges": [f"'{name}'" for name in sheet_names]}
+    ), "write")
+
+def get_sheet_titles(svc):
+    meta = execute(svc.spreadsheets().get(
+        spreadsheetId=SPREADSHEET_ID,
+        fields="sheets.properties.title"
+    ), "read")
+    return {s["properties"]["title"] for s in meta.get("sheets", [])}
+
+def add_sheets(svc, titles):
+    """Creates every tab in titles with one spreadsheets.batchUpdate."""
+    execute(svc.spreadsheets().batchUpdate(
+        spreadsheetId=SPREADSHEET_ID,
+        body={"requests": [{"addSheet": {"properties": {"title": t}}} for t in titles]}
+    ), "write")
 
 # ----------------------------
 # Helpers
 # ----------------------------
-def normalize_header(h):
-    h = (h or "").strip().lower()
-    h = re.sub(r"[\s\-_]+", " ", h)
-    h = re.sub(r"[^a-z ]+", "", h)
-    return h
-
 def find_state_column(header_row):
-    headers = [normalize_header(h) for h in header_row]
-    for i, h in enumerate(headers):
-        if h in STATE_ALIASES:
-            return i
-        for alias in STATE_ALIASES:
-            if alias in h:
-                return i
-    return None
+    return infer_columns(header_row).get("state")
+
+def require_state_column(header_row):
+    state_col = find_state_column(header_row)
+    if state_col is None:
+        raise RuntimeError(
+            f"❌ Could not find a State column.\n"
+            f"Header row was: {header_row}\n"
+            f"Accepted names: {STATE_ALIASES}"
+        )
+    return state_col
+
+def is_state_tab(title):
+    """A tab partition_by_state() writes for TARGET_SHEET_NAME."""
+    return any(
+        title == STATE_TAB_FORMAT.format(sheet=TARGET_SHEET_NAME, state=state)
+        for state in USPS_CODES | {NO_STATE}
+    )
 
 def get_cell(row, idx):
     return row[idx] if idx is not None and idx < len(row) else ""
 
+def sort_columns(header_row):
+    """Column index for each SORT_KEYS field in the header, state first."""
+    state_col = require_state_column(header_row)
+    header_map = infer_columns(header_row)
+    cols = [state_col]
+    for field in SORT_KEYS:
+        c = header_map.get(field)
+        if field != "state" and c is not None and c not in cols:
+            cols.append(c)
+    return cols
+
+def get_sheet_id(svc, sheet_name):
+    meta = execute(svc.spreadsheets().get(
+        spreadsheetId=SPREADSHEET_ID,
+        ranges=[f"'{sheet_name}'"],
+        fields="sheets.properties.sheetId"
+    ), "read")
+    return meta["sheets"][0]["properties"]["sheetId"]
+
+def sort_range(svc, sheet_name, cols):
+    """Sorts every row under the header by cols (ascending, blanks last) with one sortRange."""
+    execute(svc.spreadsheets().batchUpdate(
+        spreadsheetId=SPREADSHEET_ID,
+        body={"requests": [{"sortRange": {
+            "range": {"sheetId": get_sheet_id(svc, sheet_name), "startRowIndex": 1},
+            "sortSpecs": [{"dimensionIndex": c, "sortOrder": "ASCENDING"} for c in cols],
+        }}]}
+    ), "write")
+
 # ----------------------------
 # Core logic
 # ----------------------------
-def sort_sheet_by_state():
+def sort_sheet_by_state(mode=SORT_MODE):
     if not SPREADSHEET_ID:
         raise RuntimeError("Missing SPREADSHEET_ID in .env")
 
     svc = sheets_service()
-    rows = get_values(svc, TARGET_SHEET_NAME, TARGET_RANGE)
+    if mode == "server":
+        rows = get_values(svc, TARGET_SHEET_NAME, "1:1")
+    else:
+        rows = get_values(svc, TARGET_SHEET_NAME, TARGET_RANGE)
 
-    if not rows or len(rows) < 2:
+    if not rows or (mode != "server" and len(rows) < 2):
         print("Nothing to sort.")
         return
 
     header = rows[0]
-    data_rows = rows[1:]
+    cols = sort_columns(header)
 
-    state_col = find_state_column(header)
+    if mode == "server":
+        sort_range(svc, TARGET_SHEET_NAME, cols)
+    else:
+        # Sort rows by each key (case-insensitive, blanks last)
+        def sort_key(row):
+            vals = [str(get_cell(row, c)).strip().upper() for c in cols]
+            return [(val == "", val) for val in vals]
 
-    if state_col is None:
-        raise RuntimeError(
-            f"❌ Could not find a State column.\n"
-            f"Header row was: {header}\n"
-            f"Accepted names: {STATE_ALIASES}"
-        )
+        sorted_rows = sorted(rows[1:], key=sort_key)
+
+        # Rewrite sheet
+        clear_range(svc, TARGET_SHEET_NAME, "A1:ZZ")
+        write_rows(svc, SPREADSHEET_ID, TARGET_SHEET_NAME, 1, [header] + sorted_rows)
+
+    print(
+        f"✅ Sheet '{TARGET_SHEET_NAME}' sorted alphabetically by "
+        + ", then ".join(f"{str(header[c]).strip() or '?'} (column {c + 1})" for c in cols) + "."
+    )
+
+def partition_rows_by_state(rows, state_col, first_row=2):
+    """
+    USPS code (or NO_STATE) -> that state's (source row number, row) pairs, in source order.
+    rows[0] is sheet row first_row. Blank rows are dropped.
+    """
+    codes = {}
+    parts = {}
+    for row_number, row in enumerate(rows, first_row):
+        if not any(str(c).strip() for c in row):
+            continue
+        cell = get_cell(row, state_col)
+        if cell not in codes:
+            codes[cell] = normalize_state(cell) or NO_STATE
+        parts.setdefault(codes[cell], []).append((row_number, row))
+    return parts
+
+def lead_keys(numbered_rows, email_col, phone_col):
+    """
+    Source row number -> key of the lead in it: its email, else its phone,
+    else a hash of the row (numbered when the same key repeats).
+    """
+    seen = Counter()
+    keys = {}
+    for row_number, row in numbered_rows:
+        email = normalize_email(get_cell(row, email_col))
+        phone = normalize_phone(get_cell(row, phone_col))
+        if email:
+            base = f"email:{email}"
+        elif phone:
+            base = f"phone:{phone}"
+        else:
+            base = f"row:{fingerprint(row)}"
+        seen[base] += 1
+        keys[row_number] = base if seen[base] == 1 else f"{base}#{seen[base]}"
+    return keys
+
+def partition_by_state(incremental=True, cache=None):
+    """
+    Copies TARGET_SHEET_NAME's rows into one tab per state (STATE_TAB_FORMAT).
+    Missing tabs are created with one spreadsheets.batchUpdate and every tab
+    is written with one values.batchUpdate (split only when it's very large).
+
+    incremental: each state tab row is tracked in fingerprint_cache by the
+    lead it holds (email, else phone, else row content; see lead_keys) and a
+    hash of its content. New leads are appended, edited ones (a new email included) are
+    rewritten in place, and a lead whose state changed is blanked in its old
+    tab and appended to the new one, so a lead is never in the tabs twice.
+    Rows deleted from the source stay in the state tabs. incremental=False
+    rebuilds every state tab from scratch.
+    """
+    if not SPREADSHEET_ID:
+        raise RuntimeError("Missing SPREADSHEET_ID in .env")
+
+    svc = sheets_service()
+    rows = get_values(svc, TARGET_SHEET_NAME, TARGET_RANGE)
+    if not rows or len(rows) < 2:
+        print("Nothing to partition.")
+        return
+
+    header = rows[0]
+    width = max(len(row) for row in rows)
+    parts = partition_rows_by_state(rows[1:], require_state_column(header))
+    header_map = infer_columns(header)
+    keys = lead_keys(
+        sorted((nr for part in parts.values() for nr in part), key=lambda nr: nr[0]),
+        header_map.get("email"), header_map.get("phone"),
+    )
+    source_keys = set(keys.values())
+    header_digest = fingerprint(header)
+    cache = cache or FingerprintCache()
+    existing = get_sheet_titles(svc)
+    tab_of = {state: STATE_TAB_FORMAT.format(sheet=TARGET_SHEET_NAME, state=state) for state in parts}
+
+    # What the state tabs we can vouch for hold: tab -> row -> digest / (key, source row)
+    digests, row_keys = {}, {}
+    if incremental:
+        for tab in existing:
+            if not is_state_tab(tab):
+                continue
+            known = cache.row_digests(SPREADSHEET_ID, tab)
+            known_keys = cache.row_keys(SPREADSHEET_ID, tab)
+            if known.get(1) == header_digest and set(known_keys) == set(known) - {1}:
+                digests[tab], row_keys[tab] = known, known_keys
+    by_key = {}         # lead key -> (tab, row)
+    by_source = {}      # source row -> (tab, row, key of the lead it held)
+    for tab, known_keys in row_keys.items():
+        for n, (key, source_row) in known_keys.items():
+            by_key[key] = (tab, n)
+            by_source[source_row] = (tab, n, key)
 
-    # Sort rows by state (case-insensitive, blanks last)
-    def sort_key(row):
-        val = str(get_cell(row, state_col)).strip().upper()
-        return (val == "", val)
+    rebuild = sorted(tab for tab in tab_of.values() if tab in existing and tab not in digests)
+    next_row = {tab: max(known) + 1 for tab, known in digests.items()}
+    blocks = []
+    appends = {}        # tab -> (source row, row) to add at the bottom
+    touched = set()
+    updated = moved = 0
+    for state in sorted(parts):
+        tab = tab_of[state]
+        if tab not in digests:
+            # new tab, or one we can't vouch for (other header, not in the cache): write it whole
+            appends[tab] = list(parts[state])
+            digests[tab], row_keys[tab], next_row[tab] = {1: header_digest}, {}, 2
+            blocks.append((tab, 1, [header]))
+            touched.add(tab)
+            continue
+        for source_row, row in parts[state]:
+            key = keys[source_row]
+            place = by_key.get(key)
+            if place is None and source_row in by_source and by_source[source_row][2] not in source_keys:
+                # the lead that was in this source row is gone from the source: it was edited (e.g. a new email)
+                place = by_source[source_row][:2]
+            if place is None:
+                appends.setdefault(tab, []).append((source_row, row))
+                continue
+            old_tab, n = place
+            d = fingerprint(row)
+            if old_tab != tab:
+                # state changed: blank it in the old tab, add it to the new one
+                blocks.append((old_tab, n, [[""] * width]))
+                del digests[old_tab][n], row_keys[old_tab][n]
+                appends.setdefault(tab, []).append((source_row, row))
+                moved += 1
+                touched.add(old_tab)
+                continue
+            if digests[tab][n] != d:
+                blocks.append((tab, n, [row + [""] * (width - len(row))]))
+                updated += 1
+            if (digests[tab][n], row_keys[tab][n]) != (d, (key, source_row)):
+                digests[tab][n], row_keys[tab][n] = d, (key, source_row)
+                touched.add(tab)
 
-    sorted_rows = sorted(data_rows, key=sort_key)
+    appended = 0
+    for tab, new_rows in appends.items():
+        first = next_row[tab]
+        for i, (source_row, row) in enumerate(new_rows):
+            digests[tab][first + i] = fingerprint(row)
+            row_keys[tab][first + i] = (keys[source_row], source_row)
+        blocks.append((tab, first, [row for _, row in new_rows]))
+        appended += len(new_rows)
+        touched.add(tab)
 
-    # Rewrite sheet
-    clear_range(svc, TARGET_SHEET_NAME, "A1:ZZ")
-    update_values(svc, TARGET_SHEET_NAME, "A1", [header])
-    update_values(svc, TARGET_SHEET_NAME, "A2", sorted_rows)
+    created = sorted(set(tab_of.values()) - existing)
+    if created:
+        add_sheets(svc, created)
+    if rebuild:
+        batch_clear(svc, rebuild)
+    write_sheets(svc, SPREADSHEET_ID, blocks)
+    for tab in touched:
+        cache.replace_row_digests(SPREADSHEET_ID, tab, digests[tab])
+        cache.replace_row_keys(SPREADSHEET_ID, tab, row_keys[tab])
 
     print(
-        f"✅ Sheet '{TARGET_SHEET_NAME}' sorted alphabetically by STATE "
-        f"(column {state_col + 1})."
+        f"✅ Partitioned '{TARGET_SHEET_NAME}' into {len(parts)} state tabs: "
+        f"{appended} rows added, {updated} updated, {moved} moved to another state, "
+        f"{len(created)} tabs created, {len(rebuild)} rebuilt."
     )
 
 # ----------------------------
@@ -126,3 +329,4 @@ def sort_sheet_by_state():
 # ----------------------------
 if __name__ == "__main__":
     sort_sheet_by_state()
+    # partition_by_state()   # one tab per state instead
@@ -0,0 +1,143 @@
+"""
+Local SQLite journal of every send, keyed by normalized email.
+
+Each lead moves through:
+    intent  -> written (and fsynced) right before the Gmail send
+    sent    -> Gmail accepted the message
+    synced  -> the email_sent timestamp made it into the sheet
+
+If the process dies after an intent but before "sent", we can't know whether
+Gmail delivered it, so the address is NOT sent again (it's reported instead).
+"""
+import sqlite3
+from datetime import datetime
+
+JOURNAL_PATH = "send_journal.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sends (
+    email       TEXT PRIMARY KEY,
+    sheet       TEXT NOT NULL,
+    row_number  INTEGER NOT NULL,
+    state       TEXT NOT NULL,          -- 'intent' | 'sent'
+    intent_at   TEXT NOT NULL,
+    sent_at     TEXT,
+    synced      INTEGER NOT NULL DEFAULT 0,
+    account     TEXT                    -- Gmail account (token file) used, if several
+);
+CREATE INDEX IF NOT EXISTS sends_sheet_row ON sends (sheet, row_number);
+
+-- last row of each sheet that is fully handled, so the next run starts after it
+CREATE TABLE IF NOT EXISTS watermarks (
+    sheet        TEXT PRIMARY KEY,
+    last_row     INTEGER NOT NULL,
+    header_hash  TEXT NOT NULL,
+    anchor_hash  TEXT NOT NULL,         -- fingerprint of the lead data in last_row
+    updated_at   TEXT NOT NULL
+);
+"""
+
+
+class SendJournal:
+    def __init__(self, path: str = JOURNAL_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(SCHEMA)
+        columns = {r[1] for r in self.conn.execute("PRAGMA table_info(sends)")}
+        if "account" not in columns:
+            # journals created before multi-account sending
+            self.conn.execute("ALTER TABLE sends ADD COLUMN account TEXT")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # ----------------------------
+    # Lookups
+    # ----------------------------
+    def state_of(self, email: str):
+        """Returns 'intent', 'sent' or None (never attempted)."""
+        row = self.conn.execute("SELECT state FROM sends WHERE email = ?", (email,)).fetchone()
+        return row[0] if row else None
+
+    def already_attempted(self, email: str) -> bool:
+        return self.state_of(email) is not None
+
+    def pending_intents(self, sheet: str):
+        """Sends that were started but never confirmed (crash mid-send)."""
+        return self.conn.execute(
+            "SELECT email, row_number, intent_at FROM sends WHERE sheet = ? AND state = 'intent' ORDER BY row_number",
+            (sheet,),
+        ).fetchall()
+
+    def sends_on(self, day, account=None) -> int:
+        """
+        Sends started on this date (a datetime.date), confirmed or not, so a
+        daily cap covers every run that day. account: only that Gmail account's.
+        """
+        sql = "SELECT COUNT(*) FROM sends WHERE COALESCE(sent_at, intent_at) LIKE ?"
+        args = [f"{day.isoformat()}%"]
+        if account is not None:
+            sql += " AND account = ?"
+            args.append(account)
+        return self.conn.execute(sql, args).fetchone()[0]
+
+    def unsynced(self, sheet: str):
+        """Confirmed sends whose timestamp never reached the sheet: [(email, row_number, sent_at)]."""
+        return self.conn.execute(
+            "SELECT email, row_number, sent_at FROM sends WHERE sheet = ? AND state = 'sent' AND synced = 0 ORDER BY row_number",
+            (sheet,),
+        ).fetchall()
+
+    # ----------------------------
+    # State changes
+    # ----------------------------
+    def record_intent(self, email: str, sheet: str, row_number: int, account=None):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO sends (email, sheet, row_number, state, intent_at, account) "
+            "VALUES (?, ?, ?, 'intent', ?, ?)",
+            (email, sheet, row_number, datetime.now().isoformat(timespec="seconds"), account),
+        )
+        # a retry on another account after a quota error
+        self.conn.execute(
+            "UPDATE sends SET account = ? WHERE email = ? AND state = 'intent'", (account, email)
+        )
+        self.conn.commit()
+
+    def clear_intent(self, email: str):
+        """The send definitely did not happen (e.g. Gmail rejected it), so it may be retried later."""
+        self.conn.execute("DELETE FROM sends WHERE email = ? AND state = 'intent'", (email,))
+        self.conn.commit()
+
+    def record_sent(self, email: str, sent_at: str):
+        self.conn.execute(
+            "UPDATE sends SET state = 'sent', sent_at = ? WHERE email = ?",
+            (sent_at, email),
+        )
+        self.conn.commit()
+
+    def mark_synced(self, sheet: str, row_numbers):
+        self.conn.executemany(
+            "UPDATE sends SET synced = 1 WHERE sheet = ? AND row_number = ? AND state = 'sent'",
+            [(sheet, r) for r in row_numbers],
+        )
+        self.conn.commit()
+
+    def get_watermark(self, sheet: str):
+        """Returns (last_row, header_hash, anchor_hash) or None."""
+        return self.conn.execute(
+            "SELECT last_row, header_hash, anchor_hash FROM watermarks WHERE sheet = ?", (sheet,)
+        ).fetchone()
+
+    def set_watermark(self, sheet: str, last_row: int, header_hash: str, anchor_hash: str):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO watermarks (sheet, last_row, header_hash, anchor_hash, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (sheet, last_row, header_hash, anchor_hash, datetime.now().isoformat(timespec="seconds")),
+        )
+        self.conn.commit()
+
+    def move_row(self, email: str, row_number: int):
+        self.conn.execute("UPDATE sends SET row_number = ? WHERE email = ?", (row_number, email))
+        self.conn.commit()
@@ -1,22 +1,38 @@
 import os
 import re
+import sys
 import json
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatchcase
+from datetime import datetime
 from dotenv import load_dotenv
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from google_clients import sheets_service
+from google_retry import execute
+from fingerprint_cache import FingerprintCache, fingerprint, fingerprint_rows
+from header_schema import FIELD_ALIASES, infer_columns
+from sheet_writer import write_rows, write_sheets
+from lead_normalize import column, normalize_emails, normalize_phones, split_names, titlecase_names
+from leads_state_organizer import NO_STATE, STATE_TAB_FORMAT
+from sheets_combiner import MASTER_HEADERS, MASTER_SHEET
+from us_states import USPS_CODES
 
 load_dotenv()
 
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID", "")
-SERVICE_ACCOUNT_FILE = "sheet_service_account.json"
-SHEETS_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]  # write
 
 # === CONFIGURE TARGET SHEET HERE ===
 TARGET_SHEET_NAME = "Old Vets"   # change this
 TARGET_RANGE = "A1:ZZ"
+# Or organize many tabs in one run: name patterns like ["Vendor *"]
+# (also: python sheet_organizer.py "Vendor *"). Master, the per-state tabs
+# and _provenance are never touched.
+TARGET_SHEETS = []
 # ==================================
 
-EMAIL_RE = re.compile(r"\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}\b", re.I)
+BATCH_GET_RANGES = 20          # tabs per values.batchGet
+ORGANIZE_WORKERS = os.cpu_count() or 1
+PARALLEL_MIN_ROWS = 20_000     # below this many rows in total, transform in this process
+
 ZIP_RE = re.compile(r"\b\d{5}(-\d{4})?\b")
 
 TARGET_HEADERS = [
@@ -26,131 +42,108 @@ TARGET_HEADERS = [
     "status", "notes", "extras_json"
 ]
 
-# Header aliases (add your own if needed)
-ALIASES = {
-    "first_name": [
-        "first", "first name", "firstname", "fname", "given name"
-    ],
-    "last_name": [
-        "last", "last name", "lastname", "lname", "surname", "family name"
-    ],
-    "full_name": [
-        "name", "full name", "fullname", "client name", "prospect name"
-    ],
-    "email": [
-        "email", "e-mail", "email address", "mail", "gmail"
-    ],
-    "phone": [
-        "phone", "phone number", "phonenumber", "mobile", "cell", "cell phone", "telephone", "tel"
-    ],
-    "age": [
-        "age"
-    ],
-    "address": [
-        "address", "street", "street address", "address1", "address 1"
-    ],
-    "city": [
-        "city"
-    ],
-    "state": [
-        "state", "st", "province"
-    ],
-    "zip": [
-        "zip", "zipcode", "zip code", "postal", "postal code"
-    ],
-}
-
-def sheets_service():
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SHEETS_SCOPES
-    )
-    return build("sheets", "v4", credentials=creds)
+# Original header rows are stored once here, keyed by hash; each row's
+# extras_json only carries {"h": header hash, "r": source row, "x": {column index: unmapped cell}}
+PROVENANCE_SHEET = "_provenance"
+PROVENANCE_HEADERS = ["header_hash", "headers", "sheet", "added_at"]
+HEADER_HASH_LEN = 12
+
+# Header aliases live in header_schema.FIELD_ALIASES (shared by every script)
+ALIASES = FIELD_ALIASES
+
+# Fields whose source column is copied into the organized row (email_sent -> emailed_date);
+# every other column (duplicate_of, unknown headers) is kept in extras_json "x"
+COPIED_FIELDS = ("first_name", "last_name", "phone", "email", "age", "address", "city", "state", "zip",
+                 "email_sent")
 
 def get_values(svc, sheet_name, a1_range):
     rng = f"'{sheet_name}'!{a1_range}"
-    resp = svc.spreadsheets().values().get(
+    resp = execute(svc.spreadsheets().values().get(
         spreadsheetId=SPREADSHEET_ID,
         range=rng
-    ).execute()
+    ), "read")
     return resp.get("values", [])
 
 def clear_range(svc, sheet_name, a1_range):
     rng = f"'{sheet_name}'!{a1_range}"
-    svc.spreadsheets().values().clear(
+    execute(svc.spreadsheets().values().clear(
         spreadsheetId=SPREADSHEET_ID, range=rng, body={}
-    ).execute()
+    ), "write")
+
+def batch_get_values(svc, ranges):
+    """Values for each A1 range (with sheet name), in order, from one values.batchGet."""
+    resp = execute(svc.spreadsheets().values().batchGet(
+        spreadsheetId=SPREADSHEET_ID,
+        ranges=list(ranges)
+    ), "read")
+    return [vr.get("values", []) for vr in resp.get("valueRanges", [])]
+
+def batch_clear(svc, sheet_names, a1_range):
+    execute(svc.spreadsheets().values().batchClear(
+        spreadsheetId=SPREADSHEET_ID,
+        body={"ranges": [f"'{name}'!{a1_range}" for name in sheet_names]}
+    ), "write")
 
-def update_values(svc, sheet_name, start_cell, values):
-    rng = f"'{sheet_name}'!{start_cell}"
-    svc.spreadsheets().values().update(
+def get_sheet_titles(svc):
+    """Every tab's title, in tab order."""
+    meta = execute(svc.spreadsheets().get(
         spreadsheetId=SPREADSHEET_ID,
-        range=rng,
+        fields="sheets.properties.title"
+    ), "read")
+    return [s["properties"]["title"] for s in meta.get("sheets", [])]
+
+def add_sheet(svc, title):
+    execute(svc.spreadsheets().batchUpdate(
+        spreadsheetId=SPREADSHEET_ID,
+        body={"requests": [{"addSheet": {"properties": {"title": title}}}]}
+    ), "write")
+
+def append_values(svc, sheet_name, values):
+    execute(svc.spreadsheets().values().append(
+        spreadsheetId=SPREADSHEET_ID,
+        range=f"'{sheet_name}'!A1",
         valueInputOption="RAW",
+        insertDataOption="INSERT_ROWS",
         body={"values": values}
-    ).execute()
+    ), "write")
 
-def norm_header(h: str) -> str:
-    h = (h or "").strip().lower()
-    h = re.sub(r"[\s\-_]+", " ", h)
-    h = re.sub(r"[^a-z0-9 ]+", "", h)
-    return h
+# ----------------------------
+# Provenance
+# ----------------------------
+def header_hash(header_row) -> str:
+    return fingerprint(header_row)[:HEADER_HASH_LEN]
+
+def save_headers(svc, sheet_headers, titles=None):
+    """
+    Makes sure PROVENANCE_SHEET has every header row in sheet_headers
+    ((sheet name, header row) pairs); new ones go in with one append.
+    titles: the spreadsheet's tab titles, if the caller already has them.
+    """
+    added_at = datetime.now().isoformat(timespec="seconds")
+    entries = {}
+    for sheet_name, header_row in sheet_headers:
+        key = header_hash(header_row)
+        if key not in entries:
+            entries[key] = [key, json.dumps(header_row, ensure_ascii=False), sheet_name, added_at]
+    if not entries:
+        return
+
+    titles = get_sheet_titles(svc) if titles is None else titles
+    if PROVENANCE_SHEET not in titles:
+        add_sheet(svc, PROVENANCE_SHEET)
+        append_values(svc, PROVENANCE_SHEET, [PROVENANCE_HEADERS] + list(entries.values()))
+        return
+    known = {r[0] for r in get_values(svc, PROVENANCE_SHEET, "A2:A") if r}
+    new = [entry for key, entry in entries.items() if key not in known]
+    if new:
+        append_values(svc, PROVENANCE_SHEET, new)
 
 def build_header_map(header_row):
     """
     Returns dict: canonical_field -> column_index
-    Uses ALIASES to match.
+    Uses header_schema's shared ALIASES to match.
     """
-    headers = [norm_header(h) for h in header_row]
-    index = {}
-
-    # exact/alias matches
-    for field, aliases in ALIASES.items():
-        for i, h in enumerate(headers):
-            if h in aliases:
-                index[field] = i
-                break
-
-    # fallback: contains match (ex: "primary email")
-    for field, aliases in ALIASES.items():
-        if field in index:
-            continue
-        for i, h in enumerate(headers):
-            for a in aliases:
-                if a in h:
-                    index[field] = i
-                    break
-            if field in index:
-                break
-
-    return index
-
-def normalize_email(x):
-    if not x:
-        return ""
-    m = EMAIL_RE.search(str(x).strip())
-    return m.group(0).lower() if m else ""
-
-def normalize_phone(x):
-    if not x:
-        return ""
-    digits = re.sub(r"\D", "", str(x))
-    if len(digits) == 11 and digits.startswith("1"):
-        digits = digits[1:]
-    return digits if len(digits) == 10 else ""
-
-def split_name(full):
-    full = (full or "").strip()
-    if not full:
-        return "", ""
-    parts = full.split()
-    if len(parts) == 1:
-        return parts[0].title(), ""
-    return parts[0].title(), " ".join(parts[1:]).title()
-
-def get_cell(row, idx):
-    if idx is None:
-        return ""
-    return row[idx] if idx < len(row) else ""
+    return infer_columns(header_row)
 
 def extract_zip_anywhere(row):
     for c in row:
@@ -159,16 +152,34 @@ def extract_zip_anywhere(row):
             return m.group(0)
     return ""
 
-def organize_one_sheet_by_headers(sheet_name: str, range_a1="A1:ZZ"):
-    if not SPREADSHEET_ID:
-        raise RuntimeError("Missing SPREADSHEET_ID in .env")
+def protected_tab(sheet_name):
+    """Tabs other scripts own: Master, the per-state tabs (leads_state_organizer) and _provenance."""
+    if sheet_name in (MASTER_SHEET, PROVENANCE_SHEET):
+        return True
+    return any(
+        fnmatchcase(sheet_name, STATE_TAB_FORMAT.format(sheet="*", state=state))
+        for state in USPS_CODES | {NO_STATE}
+    )
 
-    svc = sheets_service()
-    rows = get_values(svc, sheet_name, range_a1)
-    if not rows:
-        print(f"Nothing found in {sheet_name}.")
-        return
+def skip_reason(cache, sheet_name, rows):
+    """Why this tab doesn't need organizing ("" if it does); already-organized tabs get cached."""
+    if protected_tab(sheet_name):
+        return "belongs to another script (Master / state tab / provenance)"
+    if [str(h).strip() for h in rows[0]] == MASTER_HEADERS:
+        return "has the Master header (sheets_combiner.MASTER_HEADERS)"
+    digest = fingerprint_rows(rows)
+    if cache.sheet_digest(SPREADSHEET_ID, sheet_name) == digest:
+        return "hasn't changed since it was organized"
+    if [str(h).strip() for h in rows[0]] == TARGET_HEADERS:
+        cache.set_sheet_digest(SPREADSHEET_ID, sheet_name, digest)
+        return "is already in TARGET_HEADERS layout"
+    return ""
 
+def organize_rows(sheet_name, rows):
+    """
+    A tab's values (header row first) -> (organized rows in TARGET_HEADERS
+    layout, header_map). Pure, so organize_sheets can run it in worker processes.
+    """
     header = rows[0]
     header_map = build_header_map(header)
 
@@ -177,67 +188,157 @@ def organize_one_sheet_by_headers(sheet_name: str, range_a1="A1:ZZ"):
         raise RuntimeError(
             f"Couldn't find an Email or Phone column from header row in '{sheet_name}'.\n"
             f"Header row was: {header}\n"
-            f"Add a header like 'Email' or 'Phone', or add its name to ALIASES."
+            f"Add a header like 'Email' or 'Phone', or add its name to FIELD_ALIASES in header_schema.py."
         )
 
-    organized = []
-    for r_i, row in enumerate(rows[1:], start=2):  # 1-based row numbers (row 2 = first data row)
-        extras = {
-            "source_sheet": sheet_name,
-            "source_row": r_i,
-            "original_headers": header,
-            "raw_row": row
-        }
+    data = rows[1:]
 
-        first = ""
-        last = ""
+    def cells(field):
+        return [str(c).strip() for c in column(data, header_map.get(field))]
 
-        # Prefer explicit first/last if present
-        if "first_name" in header_map:
-            first = str(get_cell(row, header_map.get("first_name"))).strip().title()
-        if "last_name" in header_map:
-            last = str(get_cell(row, header_map.get("last_name"))).strip().title()
+    # normalize a whole column at a time
+    firsts = titlecase_names(column(data, header_map.get("first_name")))
+    lasts = titlecase_names(column(data, header_map.get("last_name")))
+    fulls = split_names(cells("full_name"))
+    emails = normalize_emails(column(data, header_map.get("email")))
+    phones = normalize_phones(column(data, header_map.get("phone")))
+    ages, addresses, cities, states, zips = (cells(f) for f in ("age", "address", "city", "state", "zip"))
+    sent_dates = cells("email_sent")
 
-        # If no first/last, try full name column
-        if (not first and not last) and "full_name" in header_map:
-            full = str(get_cell(row, header_map.get("full_name"))).strip()
-            first, last = split_name(full)
+    key = header_hash(header)
+    # Only columns whose value lands in the organized row stay out of "x"
+    # (full_name only on rows where it's used)
+    copied = {header_map[f] for f in COPIED_FIELDS if f in header_map}
+    full_col = header_map.get("full_name")
+
+    organized = []
+    for i, row in enumerate(data):
+        r_i = i + 2  # 1-based row numbers (row 2 = first data row)
 
-        email = normalize_email(get_cell(row, header_map.get("email")))
-        phone = normalize_phone(get_cell(row, header_map.get("phone")))
+        # Prefer explicit first/last if present, else the full name column
+        first, last = firsts[i], lasts[i]
+        skip = copied
+        if not first and not last:
+            first, last = fulls[i]
+            skip = copied | {full_col}
 
-        age = str(get_cell(row, header_map.get("age"))).strip() if "age" in header_map else ""
-        address = str(get_cell(row, header_map.get("address"))).strip() if "address" in header_map else ""
-        city = str(get_cell(row, header_map.get("city"))).strip() if "city" in header_map else ""
-        state = str(get_cell(row, header_map.get("state"))).strip() if "state" in header_map else ""
-        zipc = str(get_cell(row, header_map.get("zip"))).strip() if "zip" in header_map else ""
+        extras = {
+            "h": key,
+            "r": r_i,
+            "x": {str(c): v for c, v in enumerate(row) if c not in skip and str(v).strip()},
+        }
 
+        zipc = zips[i]
         # If zip wasn't mapped but exists, find it anywhere
         if not zipc:
             zipc = extract_zip_anywhere(row)
 
         # Tracking columns (email program fills later)
         emailed = ""
-        emailed_date = ""
+        emailed_date = sent_dates[i]
         status = ""
         notes = ""
 
         organized.append([
-            first, last, phone, email,
-            age, address, city, state, zipc,
+            first, last, phones[i], emails[i],
+            ages[i], addresses[i], cities[i], states[i], zipc,
             emailed, emailed_date,
             status, notes,
-            json.dumps(extras, ensure_ascii=False)
+            json.dumps(extras, ensure_ascii=False, separators=(",", ":"))
         ])
+    return organized, header_map
+
+def organize_one_sheet_by_headers(sheet_name: str, range_a1="A1:ZZ", cache=None, svc=None):
+    if not SPREADSHEET_ID:
+        raise RuntimeError("Missing SPREADSHEET_ID in .env")
+
+    svc = svc or sheets_service()
+    rows = get_values(svc, sheet_name, range_a1)
+    if not rows:
+        print(f"Nothing found in {sheet_name}.")
+        return
+
+    # Don't reorganize protected tabs, Master-layout tabs or ones already in TARGET_HEADERS layout
+    cache = cache or FingerprintCache()
+    reason = skip_reason(cache, sheet_name, rows)
+    if reason:
+        print(f"⏩ '{sheet_name}' {reason}; skipping.")
+        return
+
+    organized, header_map = organize_rows(sheet_name, rows)
+    save_headers(svc, [(sheet_name, rows[0])])
 
     # Rewrite the same sheet cleanly
     clear_range(svc, sheet_name, "A1:ZZ")
-    update_values(svc, sheet_name, "A1", [TARGET_HEADERS])
-    if organized:
-        update_values(svc, sheet_name, "A2", organized)
+    write_rows(svc, SPREADSHEET_ID, sheet_name, 1, [TARGET_HEADERS] + organized)
+    cache.set_sheet_digest(SPREADSHEET_ID, sheet_name, fingerprint_rows([TARGET_HEADERS] + organized))
 
     print(f"✅ Organized '{sheet_name}' using header mapping. Rows written: {len(organized)}")
     print(f"Detected columns: {header_map}")
 
+def organize_sheets(patterns, range_a1="A1:ZZ", cache=None, svc=None, workers=ORGANIZE_WORKERS):
+    """
+    Organizes every tab whose name matches one of the patterns (fnmatch
+    style, e.g. ["Vendor *"]; protected_tab() tabs are left out) in one run: one spreadsheets.get, batchGets of BATCH_GET_RANGES
+    tabs, the transform spread over a process pool, then one batchClear and
+    batched writes for all the tabs. A tab that can't be organized (no email
+    or phone column) is reported and left alone.
+    """
+    if not SPREADSHEET_ID:
+        raise RuntimeError("Missing SPREADSHEET_ID in .env")
+
+    svc = svc or sheets_service()
+    cache = cache or FingerprintCache()
+    titles = get_sheet_titles(svc)
+    names = [t for t in titles if not protected_tab(t) and any(fnmatchcase(t, p) for p in patterns)]
+    if not names:
+        print(f"No tabs match {list(patterns)}.")
+        return
+
+    tabs = []
+    for i in range(0, len(names), BATCH_GET_RANGES):
+        chunk = names[i:i + BATCH_GET_RANGES]
+        for name, rows in zip(chunk, batch_get_values(svc, [f"'{n}'!{range_a1}" for n in chunk])):
+            reason = skip_reason(cache, name, rows) if rows else "is empty"
+            if reason:
+                print(f"⏩ '{name}' {reason}; skipping.")
+            else:
+                tabs.append((name, rows))
+    if not tabs:
+        return
+
+    results = {}
+    if workers > 1 and len(tabs) > 1 and sum(len(rows) for _, rows in tabs) >= PARALLEL_MIN_ROWS:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tabs))) as pool:
+            futures = {name: pool.submit(organize_rows, name, rows) for name, rows in tabs}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except RuntimeError as e:
+                    print(f"⚠️ {e}")
+    else:
+        for name, rows in tabs:
+            try:
+                results[name] = organize_rows(name, rows)
+            except RuntimeError as e:
+                print(f"⚠️ {e}")
+    if not results:
+        return
+
+    headers = {name: rows[0] for name, rows in tabs}
+    save_headers(svc, [(name, headers[name]) for name in results], titles)
+    batch_clear(svc, list(results), "A1:ZZ")
+    write_sheets(svc, SPREADSHEET_ID, [
+        (name, 1, [TARGET_HEADERS] + organized) for name, (organized, _) in results.items()
+    ])
+    for name, (organized, header_map) in results.items():
+        cache.set_sheet_digest(SPREADSHEET_ID, name, fingerprint_rows([TARGET_HEADERS] + organized))
+        print(f"✅ Organized '{name}' using header mapping. Rows written: {len(organized)}")
+        print(f"Detected columns: {header_map}")
+
 if __name__ == "__main__":
-    organize_one_sheet_by_headers(TARGET_SHEET_NAME, TARGET_RANGE)
+    patterns = sys.argv[1:] or TARGET_SHEETS
+    if patterns:
+        organize_sheets(patterns, TARGET_RANGE)
+    else:
+        organize_one_sheet_by_headers(TARGET_SHEET_NAME, TARGET_RANGE)
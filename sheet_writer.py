@@ -0,0 +1,132 @@
+"""
+Bulk writes to a tab, split into size-bounded requests.
+
+One values.update carrying a whole sheet fails once its body passes Google's
+request size limit (~10 MB), and the client builds all of that JSON in
+memory first. write_sheets() walks the rows once and cuts them into requests
+of at most MAX_CHUNK_BYTES of JSON / MAX_CHUNK_ROWS rows. Only the chunks
+currently being uploaded are held, at most WRITE_WORKERS at a time, each on
+its own thread and Sheets service. Every chunk is its own request, so
+google_retry retries a failed chunk without resending the others.
+
+    write_rows(svc, SPREADSHEET_ID, "Master", 2, rows)
+    write_sheets(svc, SPREADSHEET_ID, [("TX", 1, tx_rows), ("CA", 1, ca_rows)])
+"""
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from google_clients import new_sheets_service
+from google_retry import execute
+
+MAX_CHUNK_BYTES = 4_000_000     # JSON per request; Google rejects bodies past ~10 MB
+MAX_CHUNK_ROWS = 20_000
+WRITE_WORKERS = 4
+
+
+def row_bytes(row) -> int:
+    """Size of the row in the request body (the client sends ASCII-escaped JSON)."""
+    return len(json.dumps(row)) + 1
+
+
+def iter_chunks(blocks, max_bytes=MAX_CHUNK_BYTES, max_rows=MAX_CHUNK_ROWS):
+    """
+    blocks: (sheet name, first 1-based row, rows); rows may be any iterable.
+    Yields lists of (sheet name, first row, rows) pieces, each list within
+    the limits (a single row bigger than max_bytes still gets a chunk of its own).
+    """
+    chunk, size, count = [], 0, 0
+    for sheet_name, first, rows in blocks:
+        piece, start = [], first
+        for row in rows:
+            n = row_bytes(row)
+            if count and (size + n > max_bytes or count >= max_rows):
+                if piece:
+                    chunk.append((sheet_name, start, piece))
+                yield chunk
+                start += len(piece)
+                chunk, piece, size, count = [], [], 0, 0
+            piece.append(row)
+            size += n
+            count += 1
+        if piece:
+            chunk.append((sheet_name, start, piece))
+    if chunk:
+        yield chunk
+
+
+def _send(svc, spreadsheet_id, chunk, first_col):
+    execute(svc.spreadsheets().values().batchUpdate(
+        spreadsheetId=spreadsheet_id,
+        body={
+            "valueInputOption": "RAW",
+            "data": [
+                {"range": f"'{sheet_name}'!{first_col}{start}", "values": rows}
+                for sheet_name, start, rows in chunk
+            ],
+        }
+    ), "write")
+
+
+def write_sheets(svc, spreadsheet_id, blocks, first_col="A",
+                 max_bytes=MAX_CHUNK_BYTES, max_rows=MAX_CHUNK_ROWS, workers=WRITE_WORKERS):
+    """
+    Writes each (sheet name, first 1-based row, rows) block starting at column first_col.
+    A write that fits in one chunk is a single request on `svc`; bigger ones
+    are uploaded `workers` chunks at a time. Raises the first chunk failure
+    once the chunks already in flight are done. Returns the rows written.
+    """
+    chunks = iter_chunks(blocks, max_bytes, max_rows)
+    first = next(chunks, None)
+    if first is None:
+        return 0
+    second = next(chunks, None)
+    if second is None or workers <= 1:
+        written = 0
+        for chunk in _chain(first, second, chunks):
+            _send(svc, spreadsheet_id, chunk, first_col)
+            written += sum(len(rows) for _, _, rows in chunk)
+        return written
+
+    local = threading.local()
+
+    def upload(chunk):
+        if not hasattr(local, "svc"):
+            local.svc = new_sheets_service()
+        _send(local.svc, spreadsheet_id, chunk, first_col)
+        return sum(len(rows) for _, _, rows in chunk)
+
+    written = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        try:
+            for chunk in _chain(first, second, chunks):
+                if len(pending) >= workers:
+                    written += pending.popleft().result()
+                pending.append(pool.submit(upload, chunk))
+            while pending:
+                written += pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+    return written
+
+
+def _chain(first, second, rest):
+    yield first
+    if second is not None:
+        yield second
+        yield from rest
+
+
+def write_blocks(svc, spreadsheet_id, sheet_name, blocks, first_col="A", **limits):
+    """write_sheets for (first 1-based row, rows) blocks all on one tab."""
+    return write_sheets(
+        svc, spreadsheet_id, ((sheet_name, first, rows) for first, rows in blocks), first_col, **limits
+    )
+
+
+def write_rows(svc, spreadsheet_id, sheet_name, first_row, rows, first_col="A", **limits):
+    """Writes rows starting at first_col + first_row (1-based); see write_sheets."""
+    return write_sheets(svc, spreadsheet_id, [(sheet_name, first_row, rows)], first_col, **limits)
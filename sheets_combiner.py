@@ -1,9 +1,18 @@
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from dotenv import load_dotenv
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import lead_dedupe
+from fingerprint_cache import FingerprintCache, fingerprint, fingerprint_rows
+from google_clients import new_sheets_service, sheets_service
+from google_retry import execute
+from header_schema import infer_columns
+from sheet_writer import write_blocks
+from lead_normalize import (
+    column, normalize_email, normalize_emails, normalize_phone, normalize_phones, split_names, titlecase_names,
+)
+from us_states import normalize_state
 
 # ----------------------------
 # Config
@@ -11,10 +20,6 @@ from googleapiclient.discovery import build
 load_dotenv()
 
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID", "")
-SERVICE_ACCOUNT_FILE = "sheet_service_account.json"
-
-# WRITE ENABLED (because we are reorganizing)
-SHEETS_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
 MASTER_SHEET = "Master"
 
@@ -22,7 +27,8 @@ MASTER_HEADERS = [
     "first_name", "last_name", "email", "phone",
     "age", "address", "city", "state", "zip",
     "source_sheet", "source_row",
-    "status", "sent_at", "notes"
+    "status", "sent_at", "notes",
+    "duplicate_of", "match_score"
 ]
 
 # Add every raw tab you want normalized here:
@@ -34,35 +40,25 @@ SOURCE_SHEETS = [
     # ("NEW TTC", "A1:Z"),
 ]
 
+# Master and the sources are read with values.batchGet, this many ranges per request;
+# when there's more than one request they're fetched in parallel
+BATCH_GET_RANGES = 20
+FETCH_WORKERS = 4
+
+# Each source's columns are also worked out from its contents (for tabs with no
+# header row, or fields the header doesn't name): sample this many rows, and a
+# column counts when this share of its non-empty sampled cells look right
+PROFILE_SAMPLE_ROWS = 300
+PROFILE_MIN_SHARE = 0.6
+
 # ----------------------------
 # Helpers
 # ----------------------------
-EMAIL_RE = re.compile(r"\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}\b", re.I)
-
-def normalize_email(x: str) -> str:
-    return str(x).strip().lower() if x else ""
-
-def normalize_phone(x: str) -> str:
-    if not x:
-        return ""
-    digits = re.sub(r"\D", "", str(x))
-    if len(digits) == 11 and digits.startswith("1"):
-        digits = digits[1:]
-    return digits if len(digits) == 10 else ""
-
-def split_name(full: str):
-    if not full:
-        return "", ""
-    parts = str(full).strip().split()
-    if len(parts) == 1:
-        return parts[0].title(), ""
-    return parts[0].title(), " ".join(parts[1:]).title()
-
 def extract_email(row):
     for cell in row:
-        m = EMAIL_RE.search(str(cell or ""))
-        if m:
-            return normalize_email(m.group(0))
+        e = normalize_email(cell)
+        if e:
+            return e
     return ""
 
 def extract_phone(row):
@@ -72,45 +68,136 @@ def extract_phone(row):
             return p
     return ""
 
+ZIP_CELL_RE = re.compile(r"^\d{5}(-\d{4})?$")
+ADDRESS_CELL_RE = re.compile(r"^\d+[A-Za-z]?\s+[A-Za-z]")
+NAME_WORD_RE = re.compile(r"^[A-Za-z][A-Za-z.'-]*$")
+
+# field -> "does this cell look like one"; columns are claimed in this order
+CELL_TESTS = [
+    ("email", lambda v: bool(normalize_email(v))),
+    ("phone", lambda v: bool(normalize_phone(v))),
+    ("zip", lambda v: bool(ZIP_CELL_RE.match(v))),
+    ("state", lambda v: bool(normalize_state(v))),
+    ("age", lambda v: v.isdigit() and 18 <= int(v) <= 110),
+    ("address", lambda v: bool(ADDRESS_CELL_RE.match(v))),
+]
+
+def sample_rows(rows, n):
+    if len(rows) <= n:
+        return rows
+    step = len(rows) / n
+    return [rows[int(i * step)] for i in range(n)]
+
+def profile_columns(rows, sample=PROFILE_SAMPLE_ROWS):
+    """
+    Guesses canonical field -> column index from what a sample of the rows
+    holds (emails, phones, zips, states, ages, street addresses, names).
+    """
+    sampled = sample_rows(rows, sample)
+    width = max((len(r) for r in sampled), default=0)
+    cols = [
+        [v for v in (str(r[c]).strip() if c < len(r) else "" for r in sampled) if v]
+        for c in range(width)
+    ]
+
+    def share(cells, test):
+        return sum(1 for v in cells if test(v)) / len(cells)
+
+    found = {}
+    for field, test in CELL_TESTS:
+        best = None
+        for c, cells in enumerate(cols):
+            if not cells or c in found.values():
+                continue
+            score = share(cells, test)
+            if score >= PROFILE_MIN_SHARE and (best is None or score > best[0]):
+                best = (score, c)
+        if best:
+            found[field] = best[1]
+
+    # names, among the unclaimed all-letters columns: a mostly-distinct column of
+    # 2-3 word values is a full name; otherwise the one-word column with the most
+    # common given names is first_name, and last_name the most varied other one
+    def looks_like_names(v):
+        return all(NAME_WORD_RE.match(w) for w in v.split())
+
+    def given_names(v):
+        return v.split()[0].lower() in lead_dedupe.COMMON_FIRST_NAMES
+
+    wordy = [
+        c for c, cells in enumerate(cols)
+        if cells and c not in found.values() and share(cells, looks_like_names) >= PROFILE_MIN_SHARE
+    ]
+    for c in wordy:
+        cells = cols[c]
+        if (share(cells, lambda v: 2 <= len(v.split()) <= 3) >= PROFILE_MIN_SHARE
+                and len(set(cells)) >= len(cells) / 2 and share(cells, given_names) >= 0.2):
+            found["full_name"] = c
+            return found
+
+    singles = [c for c in wordy if share(cols[c], lambda v: len(v.split()) == 1) >= PROFILE_MIN_SHARE]
+    firsts = [(share(cols[c], given_names), c) for c in singles]
+    firsts = [(score, c) for score, c in firsts if score >= 0.2]
+    if firsts:
+        first = max(firsts)[1]
+        others = [c for c in singles if c not in {c2 for _, c2 in firsts}]
+        found["first_name"] = first
+        if others:
+            # surnames vary more than anything else one-word (cities, tags); ties go to a neighbour
+            found["last_name"] = max(others, key=lambda c: (len(set(cols[c])), abs(c - first) == 1, -c))
+    return found
+
 def now_iso():
     return datetime.now(timezone.utc).astimezone().isoformat(timespec="seconds")
 
 # ----------------------------
 # Sheets API
 # ----------------------------
-def sheets_service():
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SHEETS_SCOPES
-    )
-    return build("sheets", "v4", credentials=creds)
-
-def get_values(svc, sheet_name, a1_range):
-    rng = f"'{sheet_name}'!{a1_range}"
-    resp = svc.spreadsheets().values().get(
+def batch_get_values(svc, ranges):
+    """Values for each A1 range (with sheet name), in order, from one values.batchGet."""
+    resp = execute(svc.spreadsheets().values().batchGet(
         spreadsheetId=SPREADSHEET_ID,
-        range=rng
-    ).execute()
-    return resp.get("values", [])
+        ranges=list(ranges)
+    ), "read")
+    return [vr.get("values", []) for vr in resp.get("valueRanges", [])]
 
-def clear_range(svc, sheet_name, a1_range):
-    rng = f"'{sheet_name}'!{a1_range}"
-    svc.spreadsheets().values().clear(
-        spreadsheetId=SPREADSHEET_ID,
-        range=rng,
-        body={}
-    ).execute()
+def iter_sheet_values(svc, sheet_ranges, chunk=BATCH_GET_RANGES, workers=FETCH_WORKERS):
+    """
+    Yields (sheet_name, values) for each (sheet_name, a1_range) in order.
+    Ranges are fetched BATCH_GET_RANGES at a time; extra chunks are fetched in
+    parallel (each on its own service) and handed over as soon as they, and
+    every chunk before them, have arrived.
+    """
+    sheet_ranges = list(sheet_ranges)
+    ranges = [f"'{name}'!{a1}" for name, a1 in sheet_ranges]
+    chunks = [ranges[i:i + chunk] for i in range(0, len(ranges), chunk)]
+
+    if len(chunks) <= 1:
+        results = iter([batch_get_values(svc, c) for c in chunks])
+        pool = None
+    else:
+        pool = ThreadPoolExecutor(max_workers=min(workers, len(chunks)))
+        results = pool.map(lambda c: batch_get_values(new_sheets_service(), c), chunks)
+    try:
+        names = iter(sheet_ranges)
+        for values in results:
+            for rows in values:
+                yield next(names)[0], rows
+    finally:
+        if pool:
+            pool.shutdown(wait=True, cancel_futures=True)
 
 def update_values(svc, sheet_name, start_cell, values):
     rng = f"'{sheet_name}'!{start_cell}"
-    svc.spreadsheets().values().update(
+    execute(svc.spreadsheets().values().update(
         spreadsheetId=SPREADSHEET_ID,
         range=rng,
         valueInputOption="RAW",
         body={"values": values}
-    ).execute()
+    ), "write")
 
-def ensure_master_headers(svc):
-    existing = get_values(svc, MASTER_SHEET, "A1:Z1")
+def ensure_master_headers(svc, existing):
+    """existing: Master's values as read (header row first)."""
     if not existing or existing[0] != MASTER_HEADERS:
         update_values(svc, MASTER_SHEET, "A1", [MASTER_HEADERS])
 
@@ -120,30 +207,84 @@ def looks_like_header_row(row):
     return any(k in joined for k in ["email", "e-mail", "phone", "first", "last", "name", "address", "zip"])
 
 # ----------------------------
-# Core: Build/Rewrite Master
+# Core: Build/Upsert Master
 # ----------------------------
-def load_existing_master_index(svc):
-    """Return existing master rows and index maps so we preserve SENT/DNC."""
-    ensure_master_headers(svc)
-    rows = get_values(svc, MASTER_SHEET, "A2:Z")
-
-    existing_rows = []
-    by_email = {}
-    by_phone = {}
-
-    for r in rows:
-        rr = (r + [""] * len(MASTER_HEADERS))[:len(MASTER_HEADERS)]
-        existing_rows.append(rr)
-
-        email = normalize_email(rr[2])
-        phone = normalize_phone(rr[3])
-
-        if email:
-            by_email[email] = rr
-        if phone:
-            by_phone[phone] = rr
+def name_key(rr):
+    return f"{rr[0].strip().lower()}_{rr[1].strip().lower()}_{rr[8]}"
+
+def lead_id(rr):
+    """How other rows refer to this lead (duplicate_of)."""
+    email = normalize_email(rr[2])
+    if email:
+        return f"email:{email}"
+    phone = normalize_phone(rr[3])
+    if phone:
+        return f"phone:{phone}"
+    return f"name:{name_key(rr)}"
+
+def link_duplicates(master, exact_links=None):
+    """
+    Fills duplicate_of / match_score on every master row. exact_links
+    (position -> canonical position) are rows already known to be the same
+    person (score 1.00); among the rest, near-duplicates (see lead_dedupe)
+    point at the earlier lead they match, everyone else gets blanks.
+    Returns how many rows are duplicates.
+    """
+    exact_links = exact_links or {}
+    positions = [pos for pos in range(len(master)) if pos not in exact_links]
+    leads = [
+        lead_dedupe.prepare(rr[0], rr[1], normalize_email(rr[2]), normalize_phone(rr[3]), rr[5], rr[8])
+        for rr in (master[pos] for pos in positions)
+    ]
+    links = {
+        positions[i]: (positions[target], score)
+        for i, (target, score) in lead_dedupe.find_duplicates(leads).items()
+    }
+    links.update((pos, (target, 1.0)) for pos, target in exact_links.items())
+
+    for pos, rr in enumerate(master):
+        if pos in links:
+            target, score = links[pos]
+            rr[14], rr[15] = lead_id(master[target]), f"{score:.2f}"
+        else:
+            rr[14], rr[15] = "", ""
+    return len(links)
 
-    return existing_rows, by_email, by_phone
+def load_existing_master(svc, values):
+    """
+    values: Master's A1:Z as read.
+    Return existing master rows (row i is Master row i + 2), padded to MASTER_HEADERS.
+    """
+    ensure_master_headers(svc, values)
+    return [(r + [""] * len(MASTER_HEADERS))[:len(MASTER_HEADERS)] for r in values[1:]]
+
+def has_identity(rr):
+    return any(str(rr[k]).strip() for k in (0, 1, 2, 3))
+
+def record_ids(rr):
+    """Identifiers that mean "same person": email and phone."""
+    if not has_identity(rr):
+        return []
+    ids = []
+    email = normalize_email(rr[2])
+    phone = normalize_phone(rr[3])
+    if email:
+        ids.append(f"email:{email}")
+    if phone:
+        ids.append(f"phone:{phone}")
+    return ids
+
+def record_name_ids(rr):
+    """
+    name+zip (when the row has a name and a zip, or has nothing else to go on).
+    Only links rows that don't carry a different email / phone; see
+    lead_dedupe.connected_components.
+    """
+    if not has_identity(rr):
+        return []
+    if (rr[8].strip() and (rr[0].strip() or rr[1].strip())) or not record_ids(rr):
+        return [f"name:{name_key(rr)}"]
+    return []
 
 def merge_row(existing, incoming):
     """
@@ -158,124 +299,215 @@ def merge_row(existing, incoming):
     # preserve status/sent_at/notes (11..13) from existing
     return merged
 
-def build_incoming_from_source(sheet_name, row_number_1based, row):
-    email = extract_email(row)
-    phone = extract_phone(row)
-
-    first, last = split_name(row[0] if len(row) > 0 else "")
-
-    # (Optional) You can improve these later by mapping exact columns
-    age = ""
-    address = ""
-    city = ""
-    state = ""
-    zipc = ""
-
-    rr = [""] * len(MASTER_HEADERS)
-    rr[0] = first
-    rr[1] = last
-    rr[2] = email
-    rr[3] = phone
-    rr[4] = age
-    rr[5] = address
-    rr[6] = city
-    rr[7] = state
-    rr[8] = zipc
-    rr[9] = sheet_name
-    rr[10] = str(row_number_1based)
-    rr[11] = ""      # status
-    rr[12] = ""      # sent_at
-    rr[13] = ""      # notes
-    return rr
-
-def rewrite_master(svc, rows):
-    # Clear master data rows
-    clear_range(svc, MASTER_SHEET, "A2:Z")
-    if rows:
-        update_values(svc, MASTER_SHEET, "A2", rows)
-
-def normalize_all_sources_to_master():
+STATUS_RANK = {"DO_NOT_CONTACT": 3, "SENT": 2}
+
+def merge_rows(rows):
+    """
+    One row for a linked component. rows come in precedence order (existing
+    Master rows first, then sources in SOURCE_SHEETS / row order):
+      - core fields: first non-empty value
+      - status: the strongest (DO_NOT_CONTACT > SENT > anything else > blank),
+        with its sent_at
+      - notes: first non-empty
+    """
+    merged = rows[0][:]
+    for rr in rows[1:]:
+        merged = merge_row(merged, rr)
+
+    def rank(rr):
+        status = rr[11].strip().upper()
+        return STATUS_RANK.get(status, 1 if status else 0)
+
+    strongest = max(rows, key=rank)   # max keeps the first of equals
+    merged[11] = strongest[11]
+    merged[12] = strongest[12] or next((rr[12] for rr in rows if rr[12]), "")
+    merged[13] = next((rr[13] for rr in rows if rr[13]), "")
+    return merged
+
+def build_incoming_rows(sheet_name, rows, row_numbers, header_map=None):
+    """
+    Master rows for source rows (rows[i] is sheet row row_numbers[i]).
+    header_map (canonical field -> column, see infer_columns / profile_columns) picks
+    the columns; email / phone fall back to scanning the row when their cell is empty,
+    and the name falls back to column A only when no name column was found.
+    Each field is normalized a whole column at a time.
+    """
+    header_map = header_map or {}
+
+    def cells(field):
+        return [str(c).strip() for c in column(rows, header_map.get(field))]
+
+    emails = normalize_emails(column(rows, header_map.get("email")))
+    phones = normalize_phones(column(rows, header_map.get("phone")))
+    firsts = titlecase_names(column(rows, header_map.get("first_name")))
+    lasts = titlecase_names(column(rows, header_map.get("last_name")))
+    if any(f in header_map for f in ("first_name", "last_name", "full_name")):
+        fulls = split_names(cells("full_name"))
+    else:
+        # No name column found at all: assume the name is in column A
+        fulls = split_names([str(row[0]).strip() if len(row) > 0 else "" for row in rows])
+    ages, addresses, cities, states, zips = (cells(f) for f in ("age", "address", "city", "state", "zip"))
+
+    out = []
+    for i, row in enumerate(rows):
+        first, last = firsts[i], lasts[i]
+        if not (first or last):
+            first, last = fulls[i]
+
+        rr = [""] * len(MASTER_HEADERS)
+        rr[0] = first
+        rr[1] = last
+        rr[2] = emails[i] or extract_email(row)
+        rr[3] = phones[i] or extract_phone(row)
+        rr[4] = ages[i]
+        rr[5] = addresses[i]
+        rr[6] = cities[i]
+        rr[7] = states[i]
+        rr[8] = zips[i]
+        rr[9] = sheet_name
+        rr[10] = str(row_numbers[i])
+        rr[11] = ""      # status
+        rr[12] = ""      # sent_at
+        rr[13] = ""      # notes
+        rr[14] = ""      # duplicate_of
+        rr[15] = ""      # match_score
+        out.append(rr)
+    return out
+
+def changed_row_blocks(positions):
+    """Sorted master positions -> (first, last) runs of consecutive positions."""
+    blocks = []
+    for pos in positions:
+        if blocks and blocks[-1][1] == pos - 1:
+            blocks[-1][1] = pos
+        else:
+            blocks.append([pos, pos])
+    return blocks
+
+def upsert_master(svc, master, before):
+    """
+    Writes only what changed: rows whose values differ from `before` (what
+    Master held when we read it) and rows past the end of it. A normal run
+    fits in one values.batchUpdate; a big rewrite is split into size-bounded
+    chunks by sheet_writer.
+    Returns (rows updated, rows appended).
+    """
+    changed = [i for i in range(len(before)) if master[i] != before[i]]
+    appended = len(master) - len(before)
+
+    blocks = [(first + 2, master[first:last + 1]) for first, last in changed_row_blocks(changed)]
+    if appended:
+        blocks.append((len(before) + 2, master[len(before):]))
+    write_blocks(svc, SPREADSHEET_ID, MASTER_SHEET, blocks)
+    return len(changed), appended
+
+def master_digest(master):
+    """Fingerprint of Master's lead data (not status columns), to notice edits made outside this script."""
+    return fingerprint_rows(rr[:11] for rr in master)
+
+def normalize_all_sources_to_master(cache=None):
     if not SPREADSHEET_ID:
         raise RuntimeError("Missing SPREADSHEET_ID in .env")
 
     svc = sheets_service()
+    cache = cache or FingerprintCache()
 
-    existing_rows, by_email, by_phone = load_existing_master_index(svc)
+    # Master and every source come back from one (or a few) batchGets, in order
+    fetched = iter_sheet_values(svc, [(MASTER_SHEET, "A1:Z")] + list(SOURCE_SHEETS))
 
-    # Start with existing master rows so SENT/DNC stays
-    # We'll rebuild a final_map keyed by email/phone/name fallback for uniqueness
-    final_by_key = {}
+    # Existing rows keep their place (and their SENT/DNC status); new leads go below them
+    _, master_values = next(fetched)
+    master = load_existing_master(svc, master_values)
+    before = [rr[:] for rr in master]
 
-    def key_for(rr):
-        email = normalize_email(rr[2])
-        phone = normalize_phone(rr[3])
-        if email:
-            return f"email:{email}"
-        if phone:
-            return f"phone:{phone}"
-        return f"name:{rr[0].strip().lower()}_{rr[1].strip().lower()}_{rr[8]}"
-
-    # seed with existing
-    for rr in existing_rows:
-        final_by_key[key_for(rr)] = rr
+    # Tabs / rows unchanged since the last run are already in Master and are skipped,
+    # unless Master's lead data was changed by someone else since then
+    use_cache = cache.sheet_digest(SPREADSHEET_ID, MASTER_SHEET) == master_digest(master)
+    if not use_cache:
+        print("↻ Master changed outside this script (or first run); reprocessing every source row.")
+    seen_sheets = {}    # sheet -> (tab digest, {row_number: row digest}) to store once Master is written
+    skipped_sheets = 0
+    skipped_rows = 0
 
     # ingest sources
-    for sheet_name, a1 in SOURCE_SHEETS:
-        rows = get_values(svc, sheet_name, a1)
+    incoming = []
+    for sheet_name, rows in fetched:
+        sheet_digest = fingerprint_rows(rows)
+        if use_cache and cache.sheet_digest(SPREADSHEET_ID, sheet_name) == sheet_digest:
+            skipped_sheets += 1
+            continue
         if not rows:
+            seen_sheets[sheet_name] = (sheet_digest, {})
             continue
 
-        start_idx = 1 if looks_like_header_row(rows[0]) else 0
-
-        for i, row in enumerate(rows[start_idx:], start=start_idx + 1):
-            row_number_1based = i + 1
-            incoming = build_incoming_from_source(sheet_name, row_number_1based, row)
-
-            inc_email = normalize_email(incoming[2])
-            inc_phone = normalize_phone(incoming[3])
-
-            existing = None
-            if inc_email and inc_email in by_email:
-                existing = by_email[inc_email]
-            elif inc_phone and inc_phone in by_phone:
-                existing = by_phone[inc_phone]
-
-            if existing:
-                merged = merge_row(existing, incoming)
-                final_by_key[key_for(merged)] = merged
-                # update indexes with merged version
-                if merged[2]:
-                    by_email[normalize_email(merged[2])] = merged
-                if merged[3]:
-                    by_phone[normalize_phone(merged[3])] = merged
-            else:
-                final_by_key[key_for(incoming)] = incoming
-                if inc_email:
-                    by_email[inc_email] = incoming
-                if inc_phone:
-                    by_phone[inc_phone] = incoming
-
-    final_rows = list(final_by_key.values())
-
-    # Optional: stable sort (status first, then source)
-    def sort_key(rr):
-        status = (rr[11] or "").upper()
-        # keep SENT and DNC grouped
-        priority = 0
-        if status == "SENT":
-            priority = 2
-        elif status == "DO_NOT_CONTACT":
-            priority = 3
+        header_map = {}
+        start_idx = 0
+        if looks_like_header_row(rows[0]):
+            header_map = infer_columns(rows[0])
+            start_idx = 1
+        data = rows[start_idx:]
+
+        # the header decides where it names a field; the contents fill in the rest
+        column_map = {
+            f: c for f, c in profile_columns(data).items()
+            if f not in header_map and c not in header_map.values()
+        }
+        column_map.update(header_map)
+
+        # a row only counts as unchanged under the same header
+        header_digest = fingerprint(rows[0]) if start_idx else ""
+        row_digests = {
+            n: fingerprint([header_digest] + row) for n, row in enumerate(data, start=start_idx + 1)
+        }
+        known = cache.row_digests(SPREADSHEET_ID, sheet_name) if use_cache else {}
+        changed = [i for i, (n, digest) in enumerate(row_digests.items()) if known.get(n) != digest]
+        skipped_rows += len(data) - len(changed)
+        seen_sheets[sheet_name] = (sheet_digest, row_digests)
+
+        incoming.extend(
+            rr for rr in build_incoming_rows(
+                sheet_name, [data[i] for i in changed], [start_idx + 1 + i for i in changed], column_map
+            )
+            if has_identity(rr)
+        )
+
+    # Link everything that shares an email / phone (transitively), or a name+zip without
+    # conflicting emails / phones, and merge each group once.
+    # A group's first existing Master row takes the merged values; other existing rows in it are
+    # marked duplicate_of that row; groups with no Master row yet become one new row.
+    records = master + incoming
+    exact_links = {}
+    new_rows = []
+    components = lead_dedupe.connected_components(
+        [record_ids(rr) for rr in records], [record_name_ids(rr) for rr in records]
+    )
+    for component in components:
+        merged = merge_rows([records[i] for i in component])
+        canonical = component[0]
+        if canonical < len(master):
+            master[canonical] = merged
+            exact_links.update((i, canonical) for i in component[1:] if i < len(master))
         else:
-            priority = 1
-        return (priority, rr[0], rr[1], rr[2], rr[3])
+            new_rows.append(merged)
+
+    # New leads are added in name order (Master's own order is left alone)
+    master.extend(sorted(new_rows, key=lambda rr: (rr[0], rr[1], rr[2], rr[3])))
+
+    # Near-duplicates are linked, not merged
+    duplicates = link_duplicates(master, exact_links)
 
-    final_rows.sort(key=sort_key)
+    updated, appended = upsert_master(svc, master, before)
 
-    ensure_master_headers(svc)
-    rewrite_master(svc, final_rows)
+    # only now that Master holds them do these rows count as processed
+    for sheet_name, (sheet_digest, row_digests) in seen_sheets.items():
+        cache.replace_row_digests(SPREADSHEET_ID, sheet_name, row_digests)
+        cache.set_sheet_digest(SPREADSHEET_ID, sheet_name, sheet_digest)
+    cache.set_sheet_digest(SPREADSHEET_ID, MASTER_SHEET, master_digest(master))
 
-    print(f"✅ Master rebuilt: {len(final_rows)} unique leads at {now_iso()}")
+    print(f"✅ Master upserted at {now_iso()}: {appended} new, {updated} updated, "
+          f"{len(before) - updated} unchanged; {duplicates} duplicates linked")
+    if skipped_sheets or skipped_rows:
+        print(f"⏩ Skipped {skipped_sheets} unchanged tab(s) and {skipped_rows} unchanged row(s).")
 
 if __name__ == "__main__":
     normalize_all_sources_to_master()
@@ -0,0 +1,79 @@
+"""
+Shared fixtures: every test runs against fake_google's in-process services,
+with google_retry's budgets and backoff sleeps turned off.
+"""
+import base64
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google_retry  # noqa: E402
+import leademailblast  # noqa: E402
+from send_journal import SendJournal  # noqa: E402
+
+LEADS_SHEET = "Leads"
+LEAD_HEADER = ["First Name", "Last Name", "Email", "Phone", "State"]
+
+TO_RE = re.compile(r"^to: (.+)$", re.M | re.I)
+
+
+def lead_row(i, state="CA"):
+    return [f"First{i}", f"Last{i}", f"lead{i}@example.com", f"555{i:07d}", state]
+
+
+def lead_rows(n, start=0, state="CA"):
+    """LEAD_HEADER + n leads, lead{start}@example.com onwards."""
+    return [list(LEAD_HEADER)] + [lead_row(i, state) for i in range(start, start + n)]
+
+
+def recipients(gmail):
+    """Addresses the fake Gmail service sent to, in completion order."""
+    out = []
+    for body in gmail.sent:
+        raw = base64.urlsafe_b64decode(body["raw"]).decode("utf-8", errors="ignore")
+        out.append(TO_RE.search(raw).group(1).strip())
+    return out
+
+
+def email_sent_column(sheets, sheet_name=LEADS_SHEET):
+    """Each data row's email_sent cell."""
+    rows = sheets.sheets[sheet_name]
+    col = leademailblast.build_header_map(rows[0])["email_sent"]
+    return [leademailblast.get_cell(row, col) for row in rows[1:]]
+
+
+def unlimited(daily_cap=None):
+    """A limiter that never waits, with an optional daily cap."""
+    return leademailblast.SendRateLimiter(1e9, 1000, daily_cap)
+
+
+@pytest.fixture(autouse=True)
+def no_throttle(monkeypatch):
+    monkeypatch.setattr(
+        google_retry, "DEFAULT_EXECUTOR",
+        google_retry.RequestExecutor(reads_per_minute=0, writes_per_minute=0, sleep=lambda s: None),
+    )
+
+
+@pytest.fixture
+def blast(monkeypatch):
+    """leademailblast pointed at the fake spreadsheet's LEADS_SHEET, without the business card."""
+    monkeypatch.setattr(leademailblast, "SPREADSHEET_ID", "test")
+    monkeypatch.setattr(leademailblast, "TARGET_SHEET_NAME", LEADS_SHEET)
+    monkeypatch.setattr(leademailblast, "BUSINESS_CARD_PATH", None)
+    return leademailblast
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "send_journal.db")
+
+
+@pytest.fixture
+def open_journal(journal_path):
+    """Opens the test's journal (run_campaign closes the one it's given)."""
+    return lambda: SendJournal(journal_path)
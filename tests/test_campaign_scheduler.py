@@ -0,0 +1,94 @@
+"""The scheduler and leademailblast share the send journal: neither resends the other's leads."""
+from datetime import datetime, timezone
+
+import pytest
+
+import campaign_scheduler
+import fake_google
+from conftest import LEADS_SHEET, email_sent_column, lead_rows, recipients, unlimited
+from send_journal import SendJournal
+
+CAMPAIGN = {"name": "test", "sheet": LEADS_SHEET, "priority": 1, "daily_quota": None, "window": ("09:00", "17:00")}
+
+
+@pytest.fixture
+def scheduler(blast, journal_path, tmp_path, monkeypatch):
+    """Returns run(sheets, gmail, window_open) -> sends made by one scheduler pass."""
+    queue_path = str(tmp_path / "campaign_queue.db")
+
+    def run(sheets, gmail, window_open=True):
+        monkeypatch.setattr(campaign_scheduler, "in_window", lambda *args: window_open)
+        return campaign_scheduler.run_scheduler(
+            lambda: gmail, sheets, [CAMPAIGN], queue=campaign_scheduler.CampaignQueue(queue_path),
+            limiter=unlimited(), once=True, journal=SendJournal(journal_path),
+        )
+    return run
+
+
+def test_leads_sent_by_blast_after_queueing_are_not_resent(scheduler, blast, open_journal):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: lead_rows(2)})
+    gmail = fake_google.FakeGmailService()
+
+    assert scheduler(sheets, gmail, window_open=False) == 0     # queued while the window is closed
+    blast.run_campaign(lambda: gmail, sheets, journal=open_journal(), limiter=unlimited())
+    assert scheduler(sheets, gmail) == 0
+
+    assert sorted(recipients(gmail)) == ["lead0@example.com", "lead1@example.com"]
+
+
+def test_leads_marked_sent_on_the_sheet_are_dropped_from_the_queue(scheduler, blast, tmp_path):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: lead_rows(2)})
+    gmail = fake_google.FakeGmailService()
+
+    scheduler(sheets, gmail, window_open=False)
+    # sent from another machine: only the sheet knows
+    blast.run_campaign(lambda: gmail, sheets, journal=SendJournal(str(tmp_path / "other.db")), limiter=unlimited())
+    assert scheduler(sheets, gmail) == 0
+
+    assert len(gmail.sent) == 2
+
+
+def test_queued_items_are_checked_against_journal_when_drained():
+    queue = campaign_scheduler.CampaignQueue(":memory:")
+    queue.enqueue("test", [(f"lead{i}@example.com", i + 2, "First", "555", "America/New_York") for i in range(4)])
+    handled = {"lead0@example.com", "lead2@example.com"}
+    cfg = dict(CAMPAIGN, window=("00:00", "23:59"))
+    now = datetime(2026, 6, 1, 16, 0, tzinfo=timezone.utc)
+
+    leads = list(campaign_scheduler.eligible_leads(queue, [cfg], now, skip_email=handled.__contains__))
+
+    assert [lead[2] for lead in leads] == ["lead1@example.com", "lead3@example.com"]
+    assert queue.pending("test", 10, ["America/New_York"]) == [
+        (lead.item_id, lead[2], lead[0], "First", "555", "America/New_York") for lead in leads
+    ]
+
+
+def test_blast_syncs_scheduler_sends_after_a_crash(scheduler, blast, open_journal, monkeypatch):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: lead_rows(6)})
+    gmail = fake_google.FakeGmailService()
+    with monkeypatch.context() as m:
+        m.setattr(blast.SentWriteBuffer, "flush", lambda self: None)
+        assert scheduler(sheets, gmail) == 6
+
+    assert blast.run_campaign(lambda: gmail, sheets, journal=open_journal(), limiter=unlimited()) == 0
+    assert len(gmail.sent) == 6
+    assert all(email_sent_column(sheets))
+
+
+def test_time_zone_comes_from_each_leads_state(blast):
+    rows = lead_rows(2, state="NY") + lead_rows(2, start=2, state="CA")[1:] + [
+        ["No", "State", "nostate@example.com", "5550000000", ""],
+    ]
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: rows})
+    queue = campaign_scheduler.CampaignQueue(":memory:")
+
+    campaign_scheduler.sync_campaign(sheets, queue, CAMPAIGN)
+
+    tzs = dict(queue.conn.execute("SELECT email, tz FROM queue"))
+    assert tzs == {
+        "lead0@example.com": "America/New_York",
+        "lead1@example.com": "America/New_York",
+        "lead2@example.com": "America/Los_Angeles",
+        "lead3@example.com": "America/Los_Angeles",
+        "nostate@example.com": campaign_scheduler.DEFAULT_TIMEZONE,
+    }
@@ -0,0 +1,66 @@
+"""Exact linkage (connected_components) and fuzzy scoring (score_pair)."""
+import pytest
+
+from lead_dedupe import MATCH_THRESHOLD, connected_components, find_duplicates, prepare, score_pair
+
+
+def test_shared_ids_link_transitively():
+    ids = [["email:a"], ["email:a", "phone:1"], ["phone:1"], ["email:z"]]
+    assert connected_components(ids) == [[0, 1, 2], [3]]
+
+
+def test_name_zip_does_not_link_conflicting_contacts():
+    ids = [["email:a", "phone:1"], ["email:b", "phone:2"]]
+    names = [["name:john smith 90001"], ["name:john smith 90001"]]
+    assert connected_components(ids, names) == [[0], [1]]
+
+
+def test_name_zip_links_records_without_conflict():
+    ids = [["email:a"], [], ["phone:2"]]
+    names = [["name:js"], ["name:js"], ["name:js"]]
+    assert connected_components(ids, names) == [[0, 1, 2]]
+
+
+def test_name_zip_joins_first_component_it_does_not_conflict_with():
+    ids = [["email:a"], ["email:b"], []]
+    names = [["name:js"], ["name:js"], ["name:js"]]
+    assert connected_components(ids, names) == [[0, 2], [1]]
+
+
+def test_conflict_counts_the_whole_component():
+    # 1 carries email:a (through 0) and phone:1; 2's phone:2 conflicts with it
+    ids = [["email:a"], ["email:a", "phone:1"], ["phone:2"]]
+    names = [[], ["name:x"], ["name:x"]]
+    assert connected_components(ids, names) == [[0, 1], [2]]
+
+
+@pytest.mark.parametrize("a, b", [
+    (("Mark", "Lee", "", "", "", ""), ("Mary", "Lee", "", "", "", "")),
+    (("Michael", "Brown", "mb@a.com", "", "", ""), ("Michelle", "Brown", "michelleb@b.com", "", "", "")),
+    (("Robert", "Jones", "", "", "", "90001"), ("Roberta", "Jones", "", "", "", "90001")),
+    (("John", "Smith", "", "", "", ""), ("John", "Smith", "", "", "", "")),
+    (("John", "Smith", "", "5551234567", "", ""), ("John", "Smith", "", "5559876543", "", "")),
+])
+def test_name_alone_is_not_a_match(a, b):
+    assert score_pair(prepare(*a), prepare(*b)) < MATCH_THRESHOLD
+
+
+@pytest.mark.parametrize("a, b", [
+    (("Robert", "Smith", "robert.smith@gmail.com", "5551234567", "12 Main St", "90210"),
+     ("Bob", "Smith", "robertsmith@gmail.com", "", "12 Main Street", "90210")),
+    (("John", "Smyth", "", "5551234567", "", ""), ("John", "Smith", "", "5551234567", "", "")),
+    (("J.", "Smith", "", "", "12 Main St", "90210"), ("John", "Smith", "", "", "12 Main St", "90210")),
+])
+def test_name_with_supporting_evidence_matches(a, b):
+    assert score_pair(prepare(*a), prepare(*b)) >= MATCH_THRESHOLD
+
+
+def test_find_duplicates_links_later_lead_to_earlier():
+    leads = [
+        prepare("Robert", "Smith", "robert.smith@gmail.com", "5551234567", "12 Main St", "90210"),
+        prepare("Bob", "Smith", "robertsmith@gmail.com", "", "12 Main Street", "90210"),
+        prepare("Mary", "Smith", "mary@yahoo.com", "", "", "90210"),
+    ]
+    links = find_duplicates(leads)
+    assert list(links) == [1]
+    assert links[1][0] == 0
@@ -0,0 +1,82 @@
+"""Crash recovery through the send journal: unconfirmed sends are never resent, unsynced ones are written back."""
+import base64
+
+import fake_google
+from conftest import LEADS_SHEET, email_sent_column, lead_rows, recipients, unlimited
+
+
+def fail_for(address, status):
+    """error_for hook: Gmail answers `status` for this recipient."""
+    def error_for(body):
+        raw = base64.urlsafe_b64decode(body["raw"]).decode("utf-8", errors="ignore").lower()
+        return fake_google.make_http_error(status, "backendError") if f"to: {address}" in raw else None
+    return error_for
+
+
+def test_unconfirmed_send_is_not_resent(blast, open_journal):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: lead_rows(5)})
+    gmail = fake_google.FakeGmailService(error_for=fail_for("lead2@example.com", 503))
+
+    try:
+        blast.run_campaign(lambda: gmail, sheets, journal=open_journal(), limiter=unlimited())
+    except Exception:
+        pass        # send_leads re-raises the first failure
+    journal = open_journal()
+    assert journal.state_of("lead2@example.com") == "intent"
+    journal.close()
+
+    gmail.error_for = None
+    blast.run_campaign(lambda: gmail, sheets, journal=open_journal(), limiter=unlimited())
+    assert "lead2@example.com" not in recipients(gmail)
+    assert sorted(recipients(gmail)) == [f"lead{i}@example.com" for i in (0, 1, 3, 4)]
+
+
+def test_rejected_send_is_retried_next_run(blast, open_journal):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: lead_rows(3)})
+    gmail = fake_google.FakeGmailService(error_for=fail_for("lead1@example.com", 400))
+
+    try:
+        blast.run_campaign(lambda: gmail, sheets, journal=open_journal(), limiter=unlimited())
+    except Exception:
+        pass
+    journal = open_journal()
+    assert journal.state_of("lead1@example.com") is None
+    journal.close()
+
+    gmail.error_for = None
+    blast.run_campaign(lambda: gmail, sheets, journal=open_journal(), limiter=unlimited())
+    assert sorted(recipients(gmail)) == [f"lead{i}@example.com" for i in range(3)]
+
+
+def test_unsynced_sends_are_written_back_not_resent(blast, open_journal, monkeypatch):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: lead_rows(8)})
+    gmail = fake_google.FakeGmailService()
+
+    # killed before any email_sent timestamp reached the sheet
+    with monkeypatch.context() as m:
+        m.setattr(blast.SentWriteBuffer, "flush", lambda self: None)
+        assert blast.run_campaign(lambda: gmail, sheets, journal=open_journal(), limiter=unlimited()) == 8
+    assert not any(email_sent_column(sheets))
+
+    assert blast.run_campaign(lambda: gmail, sheets, journal=open_journal(), limiter=unlimited()) == 0
+    assert len(gmail.sent) == 8
+    assert all(email_sent_column(sheets))
+    journal = open_journal()
+    assert journal.unsynced(LEADS_SHEET) == []
+    journal.close()
+
+
+def test_unsynced_send_is_found_again_after_rows_move(blast, open_journal, monkeypatch):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: lead_rows(4)})
+    gmail = fake_google.FakeGmailService()
+    with monkeypatch.context() as m:
+        m.setattr(blast.SentWriteBuffer, "flush", lambda self: None)
+        blast.run_campaign(lambda: gmail, sheets, journal=open_journal(), limiter=unlimited())
+
+    rows = sheets.sheets[LEADS_SHEET]
+    rows.insert(1, ["New", "Lead", "new@example.com", "5559999999", "CA"])
+    blast.run_campaign(lambda: gmail, sheets, journal=open_journal(), limiter=unlimited())
+
+    assert recipients(gmail).count("new@example.com") == 1
+    assert len(gmail.sent) == 5
+    assert all(email_sent_column(sheets))
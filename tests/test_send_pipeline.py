@@ -0,0 +1,68 @@
+"""The concurrent send pipeline: rows are marked sent in order, and the daily cap holds across runs."""
+import base64
+import time
+
+import campaign_scheduler
+import fake_google
+from conftest import LEADS_SHEET, email_sent_column, lead_rows, recipients, unlimited
+from send_journal import SendJournal
+
+
+def slow_for(address, seconds):
+    """error_for hook that delays the send to `address`, so sends finish out of order."""
+    def error_for(body):
+        raw = base64.urlsafe_b64decode(body["raw"]).decode("utf-8", errors="ignore").lower()
+        if f"to: {address}" in raw:
+            time.sleep(seconds)
+        return None
+    return error_for
+
+
+def test_on_sent_runs_in_lead_order(blast):
+    gmail = fake_google.FakeGmailService(error_for=slow_for("lead0@example.com", 0.2))
+    leads = [(n + 2, "First", f"lead{n}@example.com", "555") for n in range(8)]
+    marked = []
+
+    sent = blast.send_leads(lambda: gmail, leads, unlimited(), lambda lead, ts: marked.append(lead[0]), workers=4)
+
+    assert sent == 8
+    assert recipients(gmail)[0] != "lead0@example.com"     # the first send really finished late
+    assert marked == [lead[0] for lead in leads]
+
+
+def test_every_sent_row_gets_its_timestamp(blast, open_journal):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: lead_rows(30)})
+    gmail = fake_google.FakeGmailService(error_for=slow_for("lead3@example.com", 0.1))
+
+    assert blast.run_campaign(lambda: gmail, sheets, journal=open_journal(), limiter=unlimited()) == 30
+    assert all(email_sent_column(sheets))
+    assert sorted(recipients(gmail)) == sorted(f"lead{i}@example.com" for i in range(30))
+
+
+def test_daily_cap_holds_across_runs(blast, open_journal):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: lead_rows(12)})
+    gmail = fake_google.FakeGmailService()
+
+    # every run is a new process with a fresh limiter
+    sent = [blast.run_campaign(lambda: gmail, sheets, journal=open_journal(), limiter=unlimited(daily_cap=5))
+            for _ in range(3)]
+
+    assert sent == [5, 0, 0]
+    assert len(gmail.sent) == 5
+    assert [bool(v) for v in email_sent_column(sheets)] == [True] * 5 + [False] * 7
+
+
+def test_daily_cap_counts_scheduler_sends(blast, journal_path, tmp_path, monkeypatch):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: lead_rows(12)})
+    gmail = fake_google.FakeGmailService()
+    blast.run_campaign(lambda: gmail, sheets, journal=SendJournal(journal_path), limiter=unlimited(daily_cap=5))
+
+    monkeypatch.setattr(campaign_scheduler, "in_window", lambda *args: True)
+    campaign = {"name": "test", "sheet": LEADS_SHEET, "priority": 1, "daily_quota": None, "window": ("00:00", "23:59")}
+    sent = campaign_scheduler.run_scheduler(
+        lambda: gmail, sheets, [campaign], queue=campaign_scheduler.CampaignQueue(str(tmp_path / "queue.db")),
+        limiter=unlimited(daily_cap=5), once=True, journal=SendJournal(journal_path),
+    )
+
+    assert sent == 0
+    assert len(gmail.sent) == 5
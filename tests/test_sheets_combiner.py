@@ -0,0 +1,79 @@
+"""Master upsert: re-running over the same sources writes nothing, and linking keeps different people apart."""
+import pytest
+
+import benchmark
+import fake_google
+import sheet_writer
+import sheets_combiner
+from fingerprint_cache import FingerprintCache
+
+WRITE_METHODS = ("values.update", "values.batchUpdate", "values.clear", "values.batchClear", "values.append")
+
+
+@pytest.fixture
+def combiner(monkeypatch):
+    """Returns run(sheets, cache_path) -> API calls made by one normalize_all_sources_to_master()."""
+    def run(sheets, cache_path):
+        monkeypatch.setattr(sheets_combiner, "SPREADSHEET_ID", "test")
+        monkeypatch.setattr(sheets_combiner, "SOURCE_SHEETS", [("Leads", "A1:Z")])
+        monkeypatch.setattr(sheets_combiner, "sheets_service", lambda: sheets)
+        monkeypatch.setattr(sheets_combiner, "new_sheets_service", lambda: sheets)
+        monkeypatch.setattr(sheet_writer, "new_sheets_service", lambda: sheets)
+        sheets.calls.clear()
+        cache = FingerprintCache(cache_path)
+        try:
+            sheets_combiner.normalize_all_sources_to_master(cache=cache)
+        finally:
+            cache.close()
+        return dict(sheets.calls)
+    return run
+
+
+def writes(calls):
+    return {m: n for m, n in calls.items() if m in WRITE_METHODS}
+
+
+def test_second_run_makes_no_writes(combiner, tmp_path):
+    sheets = fake_google.FakeSheetsService({"Leads": benchmark.make_leads(500, seed=3), "Master": []})
+    cache_path = str(tmp_path / "fingerprints.db")
+    assert writes(combiner(sheets, cache_path))
+    master = [list(r) for r in sheets.sheets["Master"]]
+
+    assert writes(combiner(sheets, cache_path)) == {}
+    assert sheets.sheets["Master"] == master
+
+
+def test_rerun_without_cache_makes_no_writes(combiner, tmp_path):
+    sheets = fake_google.FakeSheetsService({"Leads": benchmark.make_leads(500, seed=3), "Master": []})
+    combiner(sheets, str(tmp_path / "first.db"))
+    master = [list(r) for r in sheets.sheets["Master"]]
+
+    assert writes(combiner(sheets, str(tmp_path / "second.db"))) == {}
+    assert sheets.sheets["Master"] == master
+
+
+def test_new_source_rows_only_append(combiner, tmp_path):
+    rows = benchmark.make_leads(600, seed=3)
+    sheets = fake_google.FakeSheetsService({"Leads": rows[:401], "Master": []})
+    cache_path = str(tmp_path / "fingerprints.db")
+    combiner(sheets, cache_path)
+    before = [list(r) for r in sheets.sheets["Master"]]
+
+    sheets.sheets["Leads"] = rows
+    combiner(sheets, cache_path)
+    assert sheets.sheets["Master"][:len(before)] == before
+
+
+def test_same_name_and_zip_with_different_contacts_stay_apart(combiner, tmp_path):
+    sheets = fake_google.FakeSheetsService({
+        "Leads": [
+            ["First Name", "Last Name", "Email", "Phone", "Zip"],
+            ["John", "Smith", "john1@a.com", "5551110000", "90001"],
+            ["John", "Smith", "john2@b.com", "5552220000", "90001"],
+            ["John", "Smith", "", "", "90001"],
+        ],
+        "Master": [],
+    })
+    combiner(sheets, str(tmp_path / "fingerprints.db"))
+    emails = sorted(r[2] for r in sheets.sheets["Master"][1:])
+    assert emails == ["john1@a.com", "john2@b.com"]
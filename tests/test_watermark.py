@@ -0,0 +1,55 @@
+"""The scan watermark: later runs resume after it, and fall back to a full scan when rows move above it."""
+import fake_google
+from conftest import LEADS_SHEET, lead_row, lead_rows, recipients, unlimited
+
+
+def run(blast, sheets, gmail, open_journal):
+    return blast.run_campaign(lambda: gmail, sheets, journal=open_journal(), limiter=unlimited())
+
+
+def test_resumes_after_watermark(blast, open_journal, capsys):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: lead_rows(5)})
+    gmail = fake_google.FakeGmailService()
+    run(blast, sheets, gmail, open_journal)
+
+    sheets.sheets[LEADS_SHEET].append(lead_row(5))
+    capsys.readouterr()
+    assert run(blast, sheets, gmail, open_journal) == 1
+    assert "Resuming after row 6" in capsys.readouterr().out
+    assert recipients(gmail)[-1] == "lead5@example.com"
+
+
+def test_rows_inserted_above_watermark_are_found(blast, open_journal, capsys):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: lead_rows(5)})
+    gmail = fake_google.FakeGmailService()
+    run(blast, sheets, gmail, open_journal)
+
+    sheets.sheets[LEADS_SHEET].insert(2, lead_row(99))
+    capsys.readouterr()
+    assert run(blast, sheets, gmail, open_journal) == 1
+    assert "scanning the whole sheet" in capsys.readouterr().out
+    assert recipients(gmail).count("lead99@example.com") == 1
+    assert len(gmail.sent) == 6
+
+
+def test_rows_deleted_above_watermark_fall_back_to_full_scan(blast, open_journal, capsys):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: lead_rows(5)})
+    gmail = fake_google.FakeGmailService()
+    run(blast, sheets, gmail, open_journal)
+
+    del sheets.sheets[LEADS_SHEET][2]
+    capsys.readouterr()
+    assert run(blast, sheets, gmail, open_journal) == 0
+    assert "scanning the whole sheet" in capsys.readouterr().out
+    assert len(gmail.sent) == 5
+
+
+def test_header_change_falls_back_to_full_scan(blast, open_journal, capsys):
+    sheets = fake_google.FakeSheetsService({LEADS_SHEET: lead_rows(3)})
+    gmail = fake_google.FakeGmailService()
+    run(blast, sheets, gmail, open_journal)
+
+    sheets.sheets[LEADS_SHEET][0][0] = "Given Name"
+    capsys.readouterr()
+    assert run(blast, sheets, gmail, open_journal) == 0
+    assert "Header changed" in capsys.readouterr().out